@@ -7,6 +7,7 @@ import streamlit as st
 import os
 from pathlib import Path
 import uuid
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from dotenv import load_dotenv
 
 # Load environment variables
@@ -60,6 +61,78 @@ st.markdown("""
 """, unsafe_allow_html=True)
 
 
+# Cached pipeline components - kept resident across reruns so models load once
+@st.cache_resource
+def get_transcriber(model_size):
+    """Get a shared Whisper transcriber for the given model size"""
+    return AudioTranscriber(model_size=model_size)
+
+
+@st.cache_resource
+def get_highlight_finder():
+    """Get a shared highlight finder"""
+    return HighlightFinder()
+
+
+@st.cache_resource
+def get_vision_detector():
+    """Get a shared CLIP vision detector"""
+    return VisionDetector()
+
+
+@st.cache_resource
+def get_clipper():
+    """Get a shared video clipper (owns the player tracker)"""
+    return VideoClipper()
+
+
+@st.cache_resource
+def get_overlay():
+    """Get a shared caption overlay tool"""
+    return CaptionOverlay()
+
+
+# Cached pipeline results - repeated runs on the same URL skip download/Whisper.
+# Failures raise instead of returning, so they are never cached and only
+# that call is retried next time
+@st.cache_data(persist="disk", show_spinner=False)
+def cached_download(url, _video_id):
+    """Download a video and fetch its info (the id only names the file)"""
+    downloader = VideoDownloader()
+    video_path = downloader.download(url, _video_id)
+    if not video_path:
+        raise RuntimeError(f"Download failed: {url}")
+    return video_path, downloader.get_video_info(video_path, local=True)
+
+
+@st.cache_data(show_spinner=False)
+def cached_transcribe(video_path, model_size, mtime, size):
+    """
+    Transcribe a video (mtime and size key the cache on file contents)
+    
+    Kept in memory only - AudioTranscriber keeps the on-disk transcript
+    cache, keyed on the backend and decoding settings as well
+    """
+    transcript = get_transcriber(model_size).transcribe(video_path)
+    if not transcript.get("segments"):
+        raise RuntimeError(f"Transcription failed: {video_path}")
+    return transcript
+
+
+@st.cache_data(show_spinner=False)
+def cached_find_highlights(segments, top_k):
+    """Find text highlights for (start, end, text) segment tuples"""
+    transcript = {
+        "segments": [{"start": start, "end": end, "text": text}
+                     for start, end, text in segments]
+    }
+    highlights = get_highlight_finder().find_highlights(transcript, top_k=top_k)
+    if not highlights:
+        # Likely an API error - raise so the empty result isn't cached
+        raise RuntimeError("No text highlights found")
+    return highlights
+
+
 def main():
     """Main application entry point"""
     
@@ -122,6 +195,12 @@ def main():
             enable_vision = st.checkbox("Enable Vision Analysis", value=True)
             add_titles = st.checkbox("Add Titles to Clips", value=True)
             add_subtitles = st.checkbox("Add Subtitles to Clips", value=True)
+            free_gpu_memory = st.checkbox(
+                "Free GPU Memory Between Stages",
+                value=False,
+                help="Unload Whisper before CLIP runs, and CLIP before clipping "
+                     "(slower, but fits GPUs with 8GB or less)"
+            )
     
     # Main content
     st.markdown("---")
@@ -146,7 +225,7 @@ def main():
     
     if process_button and youtube_url:
         process_video(youtube_url, whisper_model, num_highlights, clip_duration, 
-                     enable_vision, add_titles, add_subtitles)
+                     enable_vision, add_titles, add_subtitles, free_gpu_memory)
     
     # Display results
     if st.session_state.clips:
@@ -177,7 +256,7 @@ def main():
 
 
 def process_video(url, whisper_model, num_highlights, clip_duration, 
-                  enable_vision, add_titles, add_subtitles):
+                  enable_vision, add_titles, add_subtitles, free_gpu_memory=False):
     """Process a YouTube video and generate highlights"""
     
     st.session_state.processing = True
@@ -187,11 +266,29 @@ def process_video(url, whisper_model, num_highlights, clip_duration,
     progress_bar = st.progress(0)
     status_text = st.empty()
     
+    # Background work: model warm-up and visual detection overlap other stages
+    executor = ThreadPoolExecutor(max_workers=2)
+    
     try:
+        # Load CLIP in the background while the video downloads. Whisper loads
+        # lazily in transcribe(), so a cached transcript never loads it
+        transcriber = get_transcriber(whisper_model)
+        if enable_vision:
+            detector = get_vision_detector()
+            if not free_gpu_memory:
+                # Otherwise CLIP loads after Whisper is unloaded
+                executor.submit(detector.load_model)
+        
         # Step 1: Download video
         status_text.info("📥 Downloading video from YouTube...")
-        downloader = VideoDownloader()
-        video_path = downloader.download(url, video_id)
+        try:
+            video_path, video_info = cached_download(url, video_id)
+            if not Path(video_path).exists():
+                # Cached file was removed from disk - download it again to the
+                # same path, so the cached entry stays valid
+                VideoDownloader().download(url, Path(video_path).stem)
+        except RuntimeError:
+            video_path = None
         progress_bar.progress(10)
         
         if not video_path or not Path(video_path).exists():
@@ -199,15 +296,17 @@ def process_video(url, whisper_model, num_highlights, clip_duration,
             st.session_state.processing = False
             return
         
-        # Get video info
-        video_info = downloader.get_video_info(url)
         st.session_state.video_info = video_info
         st.success(f"✅ Downloaded: {video_info.get('title', 'Unknown')}")
         
         # Step 2: Transcribe audio
         status_text.info("🎤 Transcribing audio with Whisper...")
-        transcriber = AudioTranscriber(model_size=whisper_model)
-        transcript = transcriber.transcribe(video_path)
+        video_stat = Path(video_path).stat()
+        try:
+            transcript = cached_transcribe(video_path, whisper_model,
+                                           video_stat.st_mtime, video_stat.st_size)
+        except RuntimeError:
+            transcript = {"segments": []}
         st.session_state.transcript = transcript
         progress_bar.progress(30)
         
@@ -219,6 +318,8 @@ def process_video(url, whisper_model, num_highlights, clip_duration,
         # Save transcript
         transcript_path = Path("output") / f"{video_id}_transcript.json"
         transcriber.save_transcript(transcript, str(transcript_path))
+        if free_gpu_memory:
+            transcriber.unload()
         
         # Display transcript preview
         with st.expander("📝 View Transcript"):
@@ -226,10 +327,19 @@ def process_video(url, whisper_model, num_highlights, clip_duration,
         
         st.success(f"✅ Transcribed {len(transcript['segments'])} segments")
         
+        # Start visual detection now so CLIP runs while the LLM call is in flight
+        vision_future = None
+        if enable_vision:
+            vision_future = executor.submit(detector.detect_highlights, video_path)
+        
         # Step 3: Find text highlights
         status_text.info("🤖 Analyzing transcript with AI...")
-        finder = HighlightFinder()
-        text_highlights = finder.find_highlights(transcript, top_k=num_highlights)
+        segments_key = tuple((seg.get("start", 0), seg.get("end", 0), seg.get("text", ""))
+                             for seg in transcript["segments"])
+        try:
+            text_highlights = cached_find_highlights(segments_key, num_highlights)
+        except RuntimeError:
+            text_highlights = []
         progress_bar.progress(50)
         
         if not text_highlights:
@@ -238,10 +348,11 @@ def process_video(url, whisper_model, num_highlights, clip_duration,
         
         # Step 4: Visual detection (optional)
         visual_highlights = []
-        if enable_vision:
+        if vision_future is not None:
             status_text.info("👁️ Analyzing video frames with CLIP...")
-            detector = VisionDetector()
-            visual_highlights = detector.detect_highlights(video_path)
+            visual_highlights = vision_future.result()
+            if free_gpu_memory:
+                detector.unload()
             progress_bar.progress(65)
         
         # Step 5: Fuse highlights
@@ -254,13 +365,16 @@ def process_video(url, whisper_model, num_highlights, clip_duration,
             
             # Display highlights
             st.subheader("🎯 Detected Highlights")
-            for i, hl in enumerate(highlights, 1):
-                st.markdown(f"""
+            highlights_html = "".join(
+                f"""
                 <div class="highlight-box">
                     <b>Highlight {i}</b> - {hl.get('timestamp', 0):.1f}s<br>
                     {hl.get('description', 'N/A')} | Score: {hl.get('score', 0):.2f}
                 </div>
-                """, unsafe_allow_html=True)
+                """
+                for i, hl in enumerate(highlights, 1)
+            )
+            st.markdown(highlights_html, unsafe_allow_html=True)
         else:
             st.error("❌ No highlights detected. Try adjusting settings or a different video.")
             st.session_state.processing = False
@@ -268,29 +382,32 @@ def process_video(url, whisper_model, num_highlights, clip_duration,
         
         # Step 6: Create clips
         status_text.info("✂️ Creating video clips...")
-        clipper = VideoClipper()
-        clipper.clip_duration = clip_duration
-        clips = clipper.create_all_clips(video_path, highlights)
+        clipper = get_clipper()
+        clips = clipper.create_all_clips(video_path, highlights, clip_duration)
         progress_bar.progress(85)
         
         # Step 7: Add overlays
         if clips and (add_titles or add_subtitles):
             status_text.info("🎨 Adding titles and subtitles...")
-            overlay_tool = CaptionOverlay()
+            overlay_tool = get_overlay()
             
-            processed_clips = []
-            for clip_data in clips:
-                processed_path = overlay_tool.process_clip(
-                    clip_data['path'],
-                    clip_data,
-                    transcript['segments'],
-                    add_title=add_titles,
-                    add_subtitles=add_subtitles
-                )
-                clip_data['processed_path'] = processed_path
-                processed_clips.append(clip_data)
+            # Each clip is an independent encode, so process them concurrently
+            max_workers = min(len(clips), os.cpu_count() or 1)
+            with ThreadPoolExecutor(max_workers=max_workers) as overlay_pool:
+                futures = {
+                    overlay_pool.submit(
+                        overlay_tool.process_clip,
+                        clip_data['path'],
+                        clip_data,
+                        transcript['segments'],
+                        add_title=add_titles,
+                        add_subtitles=add_subtitles
+                    ): clip_data
+                    for clip_data in clips
+                }
+                for future in as_completed(futures):
+                    futures[future]['processed_path'] = future.result()
             
-            clips = processed_clips
             progress_bar.progress(95)
         
         st.session_state.clips = clips
@@ -304,6 +421,7 @@ def process_video(url, whisper_model, num_highlights, clip_duration,
         st.code(traceback.format_exc())
     
     finally:
+        executor.shutdown(wait=False)
         st.session_state.processing = False
 
 
@@ -335,14 +453,14 @@ def display_results():
             # Video player
             final_path = clip_data.get('processed_path', clip_data.get('path'))
             if Path(final_path).exists():
+                st.video(final_path)
+                
+                # Download button (Streamlit reads the whole file into its
+                # media store either way - a handle does not stream it)
                 with open(final_path, "rb") as video_file:
-                    video_bytes = video_file.read()
-                    st.video(video_bytes)
-                    
-                    # Download button
                     st.download_button(
                         label=f"⬇️ Download Clip {idx + 1}",
-                        data=video_bytes,
+                        data=video_file,
                         file_name=f"nba_highlight_{idx + 1}.mp4",
                         mime="video/mp4",
                         key=f"download_{idx}"
@@ -370,7 +488,7 @@ def display_results():
                 with open(zip_path, "rb") as zip_file:
                     st.download_button(
                         label="Download ZIP",
-                        data=zip_file.read(),
+                        data=zip_file,
                         file_name="nba_highlights.zip",
                         mime="application/zip"
                     )
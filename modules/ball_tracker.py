@@ -5,26 +5,138 @@ Tracks the player with the ball in video frames for smart cropping
 
 import cv2
 import numpy as np
-from typing import List, Tuple, Optional, Dict
+from pathlib import Path
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
 import json
 
+try:
+    import onnxruntime as ort
+    ORT_AVAILABLE = True
+except ImportError:
+    ORT_AVAILABLE = False
+
+try:
+    import av
+    PYAV_AVAILABLE = True
+except ImportError:
+    PYAV_AVAILABLE = False
+
+try:
+    from numba import njit, prange
+    NUMBA_AVAILABLE = True
+except ImportError:
+    NUMBA_AVAILABLE = False
+
+
+if NUMBA_AVAILABLE:
+    @njit(parallel=True, fastmath=True, cache=True)
+    def _hsv_range_mask(bgr, lower, upper, out):
+        """
+        Fused BGR->HSV conversion and range threshold (same as cvtColor + inRange)
+        
+        Reads each BGR pixel once and writes only the mask, using OpenCV's
+        8-bit HSV scale (H in 0-180, S and V in 0-255).
+        """
+        height, width = out.shape
+        for y in prange(height):
+            for x in range(width):
+                b = np.float32(bgr[y, x, 0])
+                g = np.float32(bgr[y, x, 1])
+                r = np.float32(bgr[y, x, 2])
+                v = max(b, g, r)
+                delta = v - min(b, g, r)
+                
+                s = 255.0 * delta / v if v > 0 else 0.0
+                if delta == 0:
+                    h = 0.0
+                elif v == r:
+                    h = 60.0 * (g - b) / delta
+                elif v == g:
+                    h = 120.0 + 60.0 * (b - r) / delta
+                else:
+                    h = 240.0 + 60.0 * (r - g) / delta
+                if h < 0:
+                    h += 360.0
+                h = round(h / 2.0)
+                s = round(s)
+                
+                if (lower[0] <= h <= upper[0] and lower[1] <= s <= upper[1]
+                        and lower[2] <= v <= upper[2]):
+                    out[y, x] = 255
+                else:
+                    out[y, x] = 0
+
 
 class PlayerTracker:
     """Tracks the player with the ball in video frames"""
     
-    def __init__(self):
-        """Initialize the player tracker"""
-        # Load HOG person detector (built into OpenCV)
-        self.hog = cv2.HOGDescriptor()
-        self.hog.setSVMDetector(cv2.HOGDescriptor_getDefaultPeopleDetector())
+    def __init__(self, detector_model: str = "models/yolov8n.onnx", batch_size: int = 8):
+        """
+        Initialize the player tracker
+        
+        Args:
+            detector_model: Path to a YOLOv8 ONNX model used for person detection
+                (export with `yolo export model=yolov8n.pt format=onnx dynamic=True`).
+                Falls back to OpenCV's HOG detector if missing.
+            batch_size: Number of frames per detector inference batch
+        """
+        self.batch_size = batch_size
+        self.session = None
+        self.hog = None
+        # HOG's fixed 64x128 window misses players shorter than 128px, so it
+        # gets larger frames than the ball detector and YOLO (640 wide)
+        self.hog_width = 1280
+        
+        if ORT_AVAILABLE and Path(detector_model).exists():
+            self._load_detector(detector_model)
+        
+        if self.session is None:
+            # Load HOG person detector (built into OpenCV)
+            print("YOLO person model not available, using HOG detector")
+            self.hog = cv2.HOGDescriptor()
+            self.hog.setSVMDetector(cv2.HOGDescriptor_getDefaultPeopleDetector())
         
         # Ball detection for finding player closest to ball
         self.lower_orange = np.array([5, 50, 50])
         self.upper_orange = np.array([25, 255, 255])
         
-        # Tracking variables
-        self.tracker = None
-        self.tracked_bbox = None
+        # Reused per-frame buffers for ball detection (allocated on first use)
+        self._kernel = np.ones((5, 5), np.uint8)
+        self._hsv = None
+        self._mask = None
+        self._morph = None
+        
+        # Position smoothing: Gaussian over the per-frame trajectory
+        self.smoothing_sigma = 0.5  # Seconds
+    
+    def _load_detector(self, model_path: str):
+        """Load the YOLOv8 person detector with ONNX Runtime (GPU if available)"""
+        try:
+            available = ort.get_available_providers()
+            providers = [p for p in ("CUDAExecutionProvider", "CPUExecutionProvider")
+                         if p in available]
+            self.session = ort.InferenceSession(model_path, providers=providers)
+        except Exception as e:
+            print(f"Error loading YOLO model: {e}")
+            self.session = None
+            return
+        
+        model_input = self.session.get_inputs()[0]
+        self.input_name = model_input.name
+        self.output_name = self.session.get_outputs()[0].name
+        self.input_size = model_input.shape[2] if isinstance(model_input.shape[2], int) else 640
+        self.input_dtype = np.float16 if model_input.type == "tensor(float16)" else np.float32
+        
+        # Models exported without dynamic=True only accept a fixed batch size
+        self.fixed_batch = isinstance(model_input.shape[0], int)
+        self.max_batch = model_input.shape[0] if self.fixed_batch else self.batch_size
+        
+        # Keep inputs/outputs on the GPU between runs with IO binding
+        self.use_cuda = self.session.get_providers()[0] == "CUDAExecutionProvider"
+        self._io_binding = self.session.io_binding() if self.use_cuda else None
+        self._input_value = None
+        
+        print(f"Loaded YOLO person detector ({self.session.get_providers()[0]})")
     
     def detect_ball_position(self, frame: np.ndarray) -> Optional[Tuple[int, int]]:
         """
@@ -36,14 +148,22 @@ class PlayerTracker:
         Returns:
             (x, y) center coordinates of ball, or None if not found
         """
-        hsv = cv2.cvtColor(frame, cv2.COLOR_BGR2HSV)
-        mask = cv2.inRange(hsv, self.lower_orange, self.upper_orange)
+        if self._mask is None or self._mask.shape != frame.shape[:2]:
+            self._hsv = np.empty(frame.shape, dtype=np.uint8)
+            self._mask = np.empty(frame.shape[:2], dtype=np.uint8)
+            self._morph = np.empty(frame.shape[:2], dtype=np.uint8)
+        
+        if NUMBA_AVAILABLE:
+            _hsv_range_mask(frame, self.lower_orange, self.upper_orange, self._mask)
+        else:
+            cv2.cvtColor(frame, cv2.COLOR_BGR2HSV, dst=self._hsv)
+            cv2.inRange(self._hsv, self.lower_orange, self.upper_orange, dst=self._mask)
         
-        kernel = np.ones((5, 5), np.uint8)
-        mask = cv2.morphologyEx(mask, cv2.MORPH_OPEN, kernel)
-        mask = cv2.morphologyEx(mask, cv2.MORPH_CLOSE, kernel)
+        # Open then close, ping-ponging between the two mask buffers
+        cv2.morphologyEx(self._mask, cv2.MORPH_OPEN, self._kernel, dst=self._morph)
+        cv2.morphologyEx(self._morph, cv2.MORPH_CLOSE, self._kernel, dst=self._mask)
         
-        contours, _ = cv2.findContours(mask, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+        contours, _ = cv2.findContours(self._mask, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
         
         if not contours:
             return None
@@ -65,7 +185,7 @@ class PlayerTracker:
     
     def detect_players(self, frame: np.ndarray) -> List[Tuple[int, int, int, int]]:
         """
-        Detect players (people) in a frame using HOG detector
+        Detect players (people) in a frame
         
         Args:
             frame: BGR frame from video
@@ -73,30 +193,111 @@ class PlayerTracker:
         Returns:
             List of (x, y, w, h) bounding boxes for detected players
         """
-        # Resize frame for faster detection
+        return self.detect_players_batch([frame])[0]
+    
+    def detect_players_batch(self, frames: List[np.ndarray]) -> List[List[Tuple[int, int, int, int]]]:
+        """
+        Detect players in several frames with one detector run per batch
+        
+        Args:
+            frames: BGR frames from video
+            
+        Returns:
+            List of (x, y, w, h) bounding box lists, one per frame
+        """
+        if self.session is None:
+            return [self._detect_players_hog(frame) for frame in frames]
+        
+        results = []
+        for start in range(0, len(frames), self.max_batch):
+            chunk = frames[start:start + self.max_batch]
+            letterboxed = [self._letterbox(frame) for frame in chunk]
+            
+            # Stack into an NCHW RGB tensor in [0, 1]
+            batch = np.stack([lb[0] for lb in letterboxed])[..., ::-1].transpose(0, 3, 1, 2)
+            batch = np.ascontiguousarray(batch, dtype=self.input_dtype)
+            batch /= 255
+            if self.fixed_batch and len(chunk) < self.max_batch:
+                padding = np.zeros((self.max_batch - len(chunk),) + batch.shape[1:], batch.dtype)
+                batch = np.concatenate([batch, padding])
+            
+            outputs = self._run_detector(batch)
+            
+            for i, (_, scale, pad_x, pad_y) in enumerate(letterboxed):
+                results.append(self._parse_detections(outputs[i], scale, pad_x, pad_y))
+        
+        return results
+    
+    def _letterbox(self, frame: np.ndarray) -> Tuple[np.ndarray, float, int, int]:
+        """Resize and pad a frame to the square detector input size"""
         height, width = frame.shape[:2]
-        scale = 1.0
-        if width > 1280:
-            scale = 1280.0 / width
-            new_width = int(width * scale)
-            new_height = int(height * scale)
-            frame_resized = cv2.resize(frame, (new_width, new_height))
+        size = self.input_size
+        scale = min(size / width, size / height)
+        new_width, new_height = int(round(width * scale)), int(round(height * scale))
+        
+        resized = cv2.resize(frame, (new_width, new_height), interpolation=cv2.INTER_LINEAR)
+        canvas = np.full((size, size, 3), 114, dtype=np.uint8)
+        pad_x, pad_y = (size - new_width) // 2, (size - new_height) // 2
+        canvas[pad_y:pad_y + new_height, pad_x:pad_x + new_width] = resized
+        
+        return canvas, scale, pad_x, pad_y
+    
+    def _run_detector(self, batch: np.ndarray) -> np.ndarray:
+        """Run the YOLO session on a preprocessed batch"""
+        if self._io_binding is None:
+            return self.session.run([self.output_name], {self.input_name: batch})[0]
+        
+        # Reuse the device input buffer while the batch shape stays the same
+        if self._input_value is None or tuple(self._input_value.shape()) != batch.shape:
+            self._input_value = ort.OrtValue.ortvalue_from_numpy(batch, "cuda", 0)
         else:
-            frame_resized = frame
+            self._input_value.update_inplace(batch)
+        
+        self._io_binding.bind_ortvalue_input(self.input_name, self._input_value)
+        self._io_binding.bind_output(self.output_name, "cuda")
+        self.session.run_with_iobinding(self._io_binding)
+        return self._io_binding.copy_outputs_to_cpu()[0]
+    
+    def _parse_detections(self, output: np.ndarray, scale: float, pad_x: int,
+                          pad_y: int) -> List[Tuple[int, int, int, int]]:
+        """Convert raw YOLOv8 output for one image into person boxes"""
+        # (4 + classes, anchors) -> (anchors, 4 + classes); person is class 0
+        preds = output.T.astype(np.float32)
+        scores = preds[:, 4]
+        keep = scores > 0.4
+        if not np.any(keep):
+            return []
+        
+        cx, cy, w, h = preds[keep, :4].T
+        scores = scores[keep]
+        
+        # Undo letterbox to get (x, y, w, h) in frame coordinates
+        x = (cx - w / 2 - pad_x) / scale
+        y = (cy - h / 2 - pad_y) / scale
+        boxes = np.stack([x, y, w / scale, h / scale], axis=1).astype(int)
+        
+        indices = cv2.dnn.NMSBoxes(boxes.tolist(), scores.tolist(), 0.4, 0.45)
+        
+        player_boxes = []
+        for i in np.array(indices).flatten():
+            bx, by, bw, bh = (int(v) for v in boxes[i])
+            # Filter by aspect ratio (players are taller than wide)
+            if bh > bw * 0.8:
+                player_boxes.append((bx, by, bw, bh))
         
+        return player_boxes
+    
+    def _detect_players_hog(self, frame: np.ndarray) -> List[Tuple[int, int, int, int]]:
+        """Detect players with the OpenCV HOG people detector"""
         # Detect people
         boxes, weights = self.hog.detectMultiScale(
-            frame_resized,
+            frame,
             winStride=(8, 8),
             padding=(32, 32),
             scale=1.05,
             hitThreshold=0.6  # Lower threshold for better detection
         )
         
-        # Scale boxes back to original size if needed
-        if scale != 1.0:
-            boxes = (boxes / scale).astype(int)
-        
         # Filter and return bounding boxes
         player_boxes = []
         for (x, y, w, h) in boxes:
@@ -106,12 +307,16 @@ class PlayerTracker:
         
         return player_boxes
     
-    def find_player_with_ball(self, frame: np.ndarray) -> Optional[Tuple[int, int]]:
+    def find_player_with_ball(self, frame: np.ndarray,
+                              players: Optional[List[Tuple[int, int, int, int]]] = None,
+                              scale: float = 1.0) -> Optional[Tuple[int, int]]:
         """
         Find the player most likely to have the ball
         
         Args:
             frame: BGR frame from video
+            players: Player boxes already detected in this frame (optional)
+            scale: How much the frame was downscaled from the source video
             
         Returns:
             (x, y) center position of player with ball, or None
@@ -120,49 +325,189 @@ class PlayerTracker:
         ball_pos = self.detect_ball_position(frame)
         
         # Detect players
-        players = self.detect_players(frame)
+        if players is None:
+            players = self.detect_players(frame)
         
         if not players:
             return None
         
-        # If ball detected, find player closest to ball
+        # Player box centers as an (N, 2) array
+        boxes = np.asarray(players, dtype=np.int64)
+        centers = boxes[:, :2] + boxes[:, 2:] // 2
+        
+        # If ball detected, find player closest to ball (squared distances, no sqrt)
         if ball_pos:
-            ball_x, ball_y = ball_pos
-            min_dist = float('inf')
-            closest_player = None
+            dist_sq = ((centers - np.array(ball_pos)) ** 2).sum(axis=1)
+            closest = int(dist_sq.argmin())
             
-            for (x, y, w, h) in players:
-                player_center_x = x + w // 2
-                player_center_y = y + h // 2
-                
-                # Distance from ball to player center
-                dist = np.sqrt((ball_x - player_center_x)**2 + (ball_y - player_center_y)**2)
-                
-                if dist < min_dist:
-                    min_dist = dist
-                    closest_player = (player_center_x, player_center_y)
-            
-            if closest_player and min_dist < 200:  # Ball within reasonable distance
-                return closest_player
+            # Ball within reasonable distance (200px at source resolution)
+            if dist_sq[closest] < (200 / scale) ** 2:
+                return (int(centers[closest, 0]), int(centers[closest, 1]))
         
         # Fallback: find player closest to center of frame (often the ball handler)
         height, width = frame.shape[:2]
-        center_x, center_y = width // 2, height // 2
+        dist_sq = ((centers - np.array([width // 2, height // 2])) ** 2).sum(axis=1)
+        closest = int(dist_sq.argmin())
         
-        min_dist = float('inf')
-        center_player = None
+        return (int(centers[closest, 0]), int(centers[closest, 1]))
+    
+    def _downscale(self, frame: np.ndarray, target_width: int = 640) -> Tuple[np.ndarray, float]:
+        """
+        Shrink a frame for detection (ball and players are easy to find at 640w)
         
-        for (x, y, w, h) in players:
-            player_center_x = x + w // 2
-            player_center_y = y + h // 2
-            
-            dist = np.sqrt((center_x - player_center_x)**2 + (center_y - player_center_y)**2)
+        Returns:
+            (small_frame, scale) where scale maps small coordinates back to the source
+        """
+        height, width = frame.shape[:2]
+        if width <= target_width:
+            return frame, 1.0
+        
+        scale = width / target_width
+        small = cv2.resize(frame, (target_width, int(height / scale)),
+                           interpolation=cv2.INTER_AREA)
+        return small, scale
+    
+    def _probe_video(self, video_path: str) -> Tuple[float, float, int, int]:
+        """
+        Get basic video properties
+        
+        Returns:
+            (fps, duration_seconds, width, height)
+        """
+        if PYAV_AVAILABLE:
+            try:
+                with av.open(video_path) as container:
+                    stream = container.streams.video[0]
+                    if stream.average_rate:
+                        duration = 0.0
+                        if stream.duration is not None:
+                            duration = float(stream.duration * stream.time_base)
+                        elif container.duration is not None:
+                            duration = container.duration / av.time_base
+                        return (float(stream.average_rate), duration,
+                                stream.codec_context.width, stream.codec_context.height)
+            except Exception as e:
+                print(f"PyAV probe error: {e}")
+        
+        cap = cv2.VideoCapture(video_path)
+        fps = cap.get(cv2.CAP_PROP_FPS)
+        frame_count = cap.get(cv2.CAP_PROP_FRAME_COUNT)
+        width = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH))
+        height = int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
+        cap.release()
+        return fps, (frame_count / fps if fps else 0.0), width, height
+    
+    def _open_container(self, video_path: str):
+        """Open a video with PyAV, using NVDEC hardware decoding when available"""
+        try:
+            from av.codec.hwaccel import HWAccel
+            return av.open(video_path, hwaccel=HWAccel(device_type="cuda",
+                                                       allow_software_fallback=True))
+        except Exception:
+            return av.open(video_path)
+    
+    def _iter_frames(self, video_path: str, start_time: float, duration: float, fps: float,
+                     wanted: Optional[Callable[[int], bool]] = None
+                     ) -> Iterator[Tuple[int, np.ndarray]]:
+        """
+        Decode a section of video, yielding (frame_num, BGR frame) pairs
+        
+        Seeks to the keyframe before start_time and decodes forward. Frames
+        rejected by `wanted` are decoded but never converted to arrays.
+        
+        Args:
+            video_path: Path to video file
+            start_time: Start time in seconds
+            duration: Duration to decode in seconds
+            fps: Video frame rate
+            wanted: Predicate on frame number (relative to start_time)
+        """
+        if PYAV_AVAILABLE:
+            container = self._open_container(video_path)
+            try:
+                stream = container.streams.video[0]
+                stream.thread_type = "AUTO"
+                container.seek(int(start_time / stream.time_base), stream=stream)
+                
+                for frame in container.decode(stream):
+                    if frame.pts is None:
+                        continue
+                    frame_time = float(frame.pts * stream.time_base)
+                    if frame_time < start_time - 0.5 / fps:
+                        continue
+                    
+                    frame_num = int(round((frame_time - start_time) * fps))
+                    if frame_num / fps > duration:
+                        break
+                    if wanted is None or wanted(frame_num):
+                        yield frame_num, frame.to_ndarray(format="bgr24")
+            finally:
+                container.close()
+            return
+        
+        # Fallback: OpenCV decode, only retrieving the frames that are wanted
+        cap = cv2.VideoCapture(video_path)
+        cap.set(cv2.CAP_PROP_POS_MSEC, start_time * 1000)
+        frame_num = 0
+        try:
+            while frame_num / fps <= duration:
+                if not cap.grab():
+                    break
+                if wanted is None or wanted(frame_num):
+                    ret, frame = cap.retrieve()
+                    if ret:
+                        yield frame_num, frame
+                frame_num += 1
+        finally:
+            cap.release()
+    
+    def _detect_at_intervals(self, video_path: str, start_time: float, duration: float,
+                             fps: float, detection_interval: int) -> Dict[int, Tuple[int, int]]:
+        """
+        Find the player with the ball on every detection frame of a clip
+        
+        Only detection frames are converted from the decoder, and they are
+        downscaled once and sent to the player detector in batches.
+        
+        Returns:
+            Dictionary mapping frame number to player position
+        """
+        detections = {}
+        pending = []
+        
+        for frame_num, frame in self._iter_frames(video_path, start_time, duration, fps,
+                                                  lambda n: n % detection_interval == 0):
+            small, scale = self._downscale(frame)
+            player_frame = small
+            if self.session is None:
+                player_frame = self._downscale(frame, self.hog_width)[0]
+            pending.append((frame_num, small, scale, player_frame))
             
-            if dist < min_dist:
-                min_dist = dist
-                center_player = (player_center_x, player_center_y)
+            if len(pending) >= self.batch_size:
+                self._flush_detections(pending, detections)
         
-        return center_player
+        self._flush_detections(pending, detections)
+        return detections
+    
+    def _flush_detections(self, pending: List[Tuple[int, np.ndarray, float, np.ndarray]],
+                          detections: Dict[int, Tuple[int, int]]):
+        """Run batched player detection on pending frames and store results"""
+        if not pending:
+            return
+        
+        players_per_frame = self.detect_players_batch([player_frame
+                                                       for *_, player_frame in pending])
+        for (frame_num, small, scale, player_frame), players in zip(pending, players_per_frame):
+            if player_frame is not small:
+                # Boxes from the larger HOG frame, in small frame coordinates
+                ratio = small.shape[1] / player_frame.shape[1]
+                players = [tuple(int(v * ratio) for v in box) for box in players]
+            player_pos = self.find_player_with_ball(small, players, scale)
+            if player_pos:
+                # Scale back up to source video coordinates
+                detections[frame_num] = (int(player_pos[0] * scale), int(player_pos[1] * scale))
+        
+        pending.clear()
     
     def track_player_with_ball(self, video_path: str, start_time: float = 0, 
                                duration: float = 30) -> List[Tuple[float, int, int]]:
@@ -177,101 +522,65 @@ class PlayerTracker:
         Returns:
             List of (timestamp, x, y) tuples for player positions
         """
-        cap = cv2.VideoCapture(video_path)
-        fps = cap.get(cv2.CAP_PROP_FPS)
+        fps, video_duration, width, height = self._probe_video(video_path)
+        if not fps:
+            return []
+        
+        # Number of frames in the tracked section (clamped to the end of the video)
+        last_frame = int(duration * fps)
+        if video_duration > 0:
+            last_frame = min(last_frame, int((video_duration - start_time) * fps) - 1)
+        if last_frame < 0:
+            return []
+        frame_nums = np.arange(last_frame + 1)
         
-        # Seek to start time
-        frame_start = int(start_time * fps)
-        cap.set(cv2.CAP_PROP_POS_FRAMES, frame_start)
-        
-        positions = []
-        frame_num = 0
-        last_position = None
-        
-        # Use CSRT tracker for smooth tracking between detections
-        tracker = None
-        tracked_bbox = None
+        # Process every Nth frame for detection (every 0.5 seconds)
+        detection_interval = max(1, int(fps * 0.5))
+        
+        # Detection pass: batch-detect the player with the ball
+        detections = self._detect_at_intervals(video_path, start_time, duration, fps,
+                                               detection_interval)
+        
+        # Linearly interpolate between detections (held constant at the ends);
+        # fall back to the frame center if the player was never found
+        if detections:
+            det_frames = np.array(sorted(detections))
+            det_pos = np.array([detections[n] for n in det_frames], dtype=np.float64)
+            xs = np.interp(frame_nums, det_frames, det_pos[:, 0])
+            ys = np.interp(frame_nums, det_frames, det_pos[:, 1])
+        else:
+            xs = np.full(len(frame_nums), width // 2, dtype=np.float64)
+            ys = np.full(len(frame_nums), height // 2, dtype=np.float64)
         
-        # Smoothing: use moving average for position
-        position_history = []
-        history_size = 7  # Larger history for smoother tracking
+        # Smooth the whole trajectory at once so the crop doesn't jitter
+        sigma = self.smoothing_sigma * fps
+        xs = self._gaussian_smooth(xs, sigma)
+        ys = self._gaussian_smooth(ys, sigma)
         
-        # Process every Nth frame for detection (every 0.5 seconds)
-        detection_interval = int(fps * 0.5)
+        times = start_time + frame_nums / fps
+        return [(float(t), int(x), int(y)) for t, x, y in zip(times, xs, ys)]
+    
+    def _gaussian_smooth(self, values: np.ndarray, sigma: float) -> np.ndarray:
+        """
+        Smooth a 1D signal with a Gaussian kernel (edges held constant)
         
-        while True:
-            ret, frame = cap.read()
-            if not ret:
-                break
-            
-            current_time = start_time + (frame_num / fps)
-            if current_time > start_time + duration:
-                break
-            
-            player_pos = None
-            
-            # Detection phase: detect player with ball
-            if frame_num % detection_interval == 0 or tracker is None:
-                player_pos = self.find_player_with_ball(frame)
-                
-                if player_pos:
-                    # Initialize or reinitialize tracker
-                    # Create bounding box around player
-                    px, py = player_pos
-                    bbox_size = 150  # Estimated player size
-                    bbox = (px - bbox_size//2, py - bbox_size//2, bbox_size, bbox_size)
-                    bbox = tuple(max(0, int(v)) for v in bbox)
-                    
-                    if tracker is None:
-                        tracker = cv2.TrackerCSRT_create()
-                        tracker.init(frame, bbox)
-                        tracked_bbox = bbox
-                        last_position = player_pos
-                    else:
-                        # Reinitialize tracker if detection found
-                        tracker = cv2.TrackerCSRT_create()
-                        tracker.init(frame, bbox)
-                        tracked_bbox = bbox
-                        last_position = player_pos
-            
-            # Tracking phase: use tracker to follow player
-            if tracker is not None:
-                success, bbox = tracker.update(frame)
-                if success:
-                    x, y, w, h = [int(v) for v in bbox]
-                    player_pos = (x + w // 2, y + h // 2)
-                    tracked_bbox = bbox
-                    last_position = player_pos
-                else:
-                    # Tracker lost, use last position
-                    if last_position:
-                        player_pos = last_position
-            
-            # Fallback if no position found
-            if player_pos is None:
-                if last_position is not None:
-                    player_pos = last_position
-                else:
-                    # Use frame center as fallback
-                    h, w = frame.shape[:2]
-                    player_pos = (w // 2, h // 2)
-            
-            # Add to history for smoothing
-            position_history.append(player_pos)
-            if len(position_history) > history_size:
-                position_history.pop(0)
-            
-            # Average position for smoothing (weighted towards recent positions)
-            weights = np.linspace(0.5, 1.0, len(position_history))
-            avg_x = int(np.average([p[0] for p in position_history], weights=weights))
-            avg_y = int(np.average([p[1] for p in position_history], weights=weights))
-            
-            positions.append((current_time, avg_x, avg_y))
+        Args:
+            values: Signal to smooth
+            sigma: Kernel standard deviation in samples
             
-            frame_num += 1
+        Returns:
+            Smoothed signal, same length as values
+        """
+        radius = int(4 * sigma + 0.5)
+        if radius < 1 or len(values) < 2:
+            return values
         
-        cap.release()
-        return positions
+        offsets = np.arange(-radius, radius + 1, dtype=np.float64)
+        kernel = np.exp(-0.5 * (offsets / sigma) ** 2)
+        kernel /= kernel.sum()
+        
+        padded = np.pad(values, radius, mode="edge")
+        return np.convolve(padded, kernel, mode="valid")
     
     def get_crop_region(self, player_x: int, player_y: int, frame_width: int, 
                        frame_height: int, crop_width: int, crop_height: int) -> Tuple[int, int]:
@@ -289,11 +598,36 @@ class PlayerTracker:
         Returns:
             (crop_x, crop_y) top-left corner of crop region
         """
+        crop_x, crop_y = self.get_crop_regions([player_x], [player_y], frame_width,
+                                               frame_height, crop_width, crop_height)[0]
+        return (int(crop_x), int(crop_y))
+    
+    def get_crop_regions(self, player_xs, player_ys, frame_width: int, frame_height: int,
+                         crop_width: int, crop_height: int) -> np.ndarray:
+        """
+        Calculate crop regions for many player positions at once
+        
+        Args:
+            player_xs: Player X positions
+            player_ys: Player Y positions
+            frame_width: Full frame width
+            frame_height: Full frame height
+            crop_width: Desired crop width
+            crop_height: Desired crop height
+            
+        Returns:
+            (N, 2) int array of (crop_x, crop_y) top-left corners
+        """
         # Center crop on player, offset slightly upward to show player better
         offset_y = int(crop_height * 0.1)  # Shift up 10% to show player better
         
-        crop_x = max(0, min(player_x - crop_width // 2, frame_width - crop_width))
-        crop_y = max(0, min(player_y - crop_height // 2 - offset_y, frame_height - crop_height))
+        xs = np.asarray(player_xs, dtype=np.int64)
+        ys = np.asarray(player_ys, dtype=np.int64)
+        
+        # max(0, min(...)) rather than np.clip so oversized crops pin to 0
+        crop_x = np.maximum(0, np.minimum(xs - crop_width // 2, frame_width - crop_width))
+        crop_y = np.maximum(0, np.minimum(ys - crop_height // 2 - offset_y,
+                                          frame_height - crop_height))
         
-        return (crop_x, crop_y)
+        return np.stack([crop_x, crop_y], axis=1)
 
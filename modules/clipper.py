@@ -3,12 +3,12 @@ Video Clip Extraction Module
 Uses FFmpeg to cut clips from the original video and format for YouTube Shorts
 """
 
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from functools import lru_cache
 from pathlib import Path
 import subprocess
-from typing import Dict, List
-import os
-from moviepy.video.io.VideoFileClip import VideoFileClip
-from moviepy.video.compositing.CompositeVideoClip import CompositeVideoClip
+import threading
+from typing import Dict, List, Optional, Tuple
 import numpy as np
 import cv2
 
@@ -20,16 +20,40 @@ except ImportError:
     PlayerTracker = None
 
 
+@lru_cache(maxsize=None)
+def nvenc_available() -> bool:
+    """Check once whether FFmpeg can actually encode with NVENC on this machine"""
+    try:
+        result = subprocess.run(
+            [
+                "ffmpeg", "-hide_banner",
+                "-f", "lavfi", "-i", "color=black:s=256x256:d=0.1",
+                "-c:v", "h264_nvenc",
+                "-f", "null", "-"
+            ],
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL
+        )
+        return result.returncode == 0
+    except FileNotFoundError:
+        return False
+
+
 class VideoClipper:
     """Handles cutting video clips using FFmpeg and formatting for YouTube Shorts"""
     
-    def __init__(self, output_dir: str = "output/clips", enable_ball_tracking: bool = True):
+    def __init__(self, output_dir: str = "output/clips", enable_ball_tracking: bool = True,
+                 hw_accel: str = "cuda", nvenc_sessions: int = 3):
         """
         Initialize the clipper
         
         Args:
             output_dir: Directory to save clips
             enable_ball_tracking: Whether to track ball and center crop on it
+            hw_accel: Hardware acceleration to use ("cuda" for NVDEC/NVENC when
+                available, "" to always encode with libx264)
+            nvenc_sessions: Maximum number of clips encoded concurrently
+                (consumer GPUs limit simultaneous NVENC sessions)
         """
         self.output_dir = Path(output_dir)
         self.output_dir.mkdir(parents=True, exist_ok=True)
@@ -42,11 +66,35 @@ class VideoClipper:
             self.tracker = PlayerTracker()
         else:
             self.tracker = None
+        
+        # PlayerTracker reuses frame buffers between calls, so concurrent
+        # clips each borrow their own tracker from this pool
+        self._idle_trackers = [self.tracker] if self.tracker else []
+        self._tracker_lock = threading.Lock()
+        self.nvenc_sessions = max(1, nvenc_sessions)
+        
+        # Hardware decode/encode, falling back to libx264 without an NVIDIA GPU
+        self.use_nvenc = hw_accel == "cuda" and nvenc_available()
+        self.video_codec = "h264_nvenc" if self.use_nvenc else "libx264"
+    
+    def _decoder_args(self) -> List[str]:
+        """FFmpeg input options for hardware decoding"""
+        return ["-hwaccel", "cuda"] if self.use_nvenc else []
+    
+    def _encoder_args(self) -> List[str]:
+        """FFmpeg output options for H.264 encoding (NVENC or libx264)"""
+        if self.use_nvenc:
+            return ["-c:v", "h264_nvenc", "-preset", "p4", "-tune", "hq",
+                    "-rc", "vbr", "-cq", "23"]
+        return ["-c:v", "libx264", "-preset", "medium", "-crf", "23"]
     
     def create_clip(self, video_path: str, timestamp: float, clip_id: int, 
                     duration: float = None) -> str:
         """
-        Create a video clip from the original video
+        Create a YouTube Shorts clip (9:16 vertical, 1080x1920) from the original video
+        
+        Cutting, cropping (with optional ball tracking) and encoding happen in
+        a single FFmpeg run, without an intermediate clip on disk.
         
         Args:
             video_path: Path to source video
@@ -60,247 +108,354 @@ class VideoClipper:
         if duration is None:
             duration = self.clip_duration
         
-        output_path = self.output_dir / f"clip_{clip_id}.mp4"
+        output_path = self.output_dir / f"clip_{clip_id}_shorts.mp4"
         
+        video_filter, cmd_path = self._shorts_filter(video_path, timestamp, clip_id, duration)
         try:
-            # Use FFmpeg to cut the clip
-            cmd = [
-                "ffmpeg",
-                "-i", video_path,
-                "-ss", str(timestamp),
-                "-t", str(duration),
-                "-c:v", "libx264",
-                "-c:a", "aac",
-                "-preset", "fast",
-                "-avoid_negative_ts", "make_zero",
-                "-y",  # Overwrite output file
-                str(output_path)
-            ]
-            
-            # Run FFmpeg with suppressed output
-            subprocess.run(
-                cmd,
-                stdout=subprocess.DEVNULL,
-                stderr=subprocess.DEVNULL,
-                check=True
-            )
-            
-            if output_path.exists():
-                # Format clip for YouTube Shorts (vertical 9:16) with ball tracking
-                formatted_path = self.format_for_shorts(str(output_path), clip_id)
-                return formatted_path if formatted_path else str(output_path)
-            else:
-                return ""
-                
+            self._encode_shorts(video_path, [(timestamp, video_filter, output_path)], duration)
         except subprocess.CalledProcessError as e:
-            print(f"Clip creation error: {e}")
-            return ""
+            if cmd_path is None:
+                print(f"Clip creation error: {e}")
+                return ""
+            # Fallback to simple center crop
+            print(f"Player tracking error: {e}, falling back to center crop")
+            try:
+                self._encode_shorts(video_path, [(timestamp, self._center_crop_filter(), output_path)],
+                                    duration)
+            except subprocess.CalledProcessError as e:
+                print(f"Clip creation error: {e}")
+                return ""
         except Exception as e:
             print(f"Unexpected error creating clip: {e}")
             return ""
+        finally:
+            if cmd_path is not None:
+                cmd_path.unlink(missing_ok=True)
+        
+        return str(output_path) if output_path.exists() else ""
+    
+    def _probe_size(self, video_path: str) -> Tuple[int, int]:
+        """Get (width, height) of a video"""
+        cap = cv2.VideoCapture(video_path)
+        width = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH))
+        height = int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
+        cap.release()
+        return width, height
     
-    def format_for_shorts(self, video_path: str, clip_id: int) -> str:
+    def _center_crop_filter(self) -> str:
+        """Filter chain for a simple center crop without tracking"""
+        # Crop the centered 9:16 column at source resolution first, so the
+        # scaler only touches pixels that end up in the output
+        crop_width = f"trunc(ih*{self.shorts_width}/{self.shorts_height}/2)*2"
+        return (
+            f"crop={crop_width}:ih:(iw-{crop_width})/2:0,"
+            f"scale={self.shorts_width}:{self.shorts_height}:flags=bicubic,"
+            f"setsar=1"
+        )
+    
+    def _tracking_filter(self, video_path: str, timestamp: float, clip_id: int,
+                         duration: float, source_size: Tuple[int, int]
+                         ) -> Optional[Tuple[str, Path]]:
         """
-        Format video clip for YouTube Shorts (9:16 vertical format, 1080x1920)
-        With optional ball tracking to center crop on the ball
+        Build a filter chain whose crop follows the player with the ball
+        
+        Tracked positions are written to a sendcmd script that moves a named
+        crop filter over time.
         
         Args:
-            video_path: Path to input video clip
-            clip_id: Clip identifier
+            video_path: Path to source video
+            timestamp: Clip start time in the source
+            clip_id: Clip identifier (names the script and crop filter)
+            duration: Clip duration in seconds
+            source_size: (width, height) of the source video
             
         Returns:
-            Path to formatted video, or empty string if failed
+            (filter chain, sendcmd script path), or None to use the center crop
         """
-        output_path = self.output_dir / f"clip_{clip_id}_shorts.mp4"
+        original_width, original_height = source_size
+        
+        # Scale factor to fit height
+        scale_factor = self.shorts_height / original_height
+        scaled_width = int(original_width * scale_factor) // 2 * 2
+        
+        if scaled_width <= self.shorts_width:
+            # Nothing to pan across - the frame is already narrow enough
+            return None
         
+        print(f"Tracking player with ball in clip {clip_id}...")
+        
+        # Track player positions
+        tracker = self._acquire_tracker()
         try:
-            if self.enable_ball_tracking and self.tracker:
-                # Use MoviePy for dynamic ball-tracking-based cropping
-                return self._format_with_ball_tracking(video_path, output_path, clip_id)
-            else:
-                # Use FFmpeg for simple center crop
-                return self._format_simple_center_crop(video_path, output_path)
-                
-        except Exception as e:
-            print(f"Error formatting for shorts: {e}")
-            # Fallback to simple center crop
-            return self._format_simple_center_crop(video_path, output_path)
+            player_positions = tracker.track_player_with_ball(video_path, start_time=timestamp,
+                                                              duration=duration)
+        finally:
+            self._release_tracker(tracker)
+        
+        if not player_positions:
+            print("No player detected, using center crop")
+            return None
+        
+        # Trajectory as time-sorted arrays, with times relative to the clip start
+        positions = np.asarray(player_positions, dtype=np.float64)
+        positions = positions[np.argsort(positions[:, 0], kind="stable")]
+        times, xs, ys = positions[:, 0] - timestamp, positions[:, 1], positions[:, 2]
+        
+        # Crop window position for each tracked sample, computed on positions
+        # pre-scaled to the scaled frame (the crop always spans the full
+        # scaled height, so only x moves)
+        xs_scaled = (xs * scale_factor).astype(np.int32)
+        ys_scaled = (ys * scale_factor).astype(np.int32)
+        crop_xs = self.tracker.get_crop_regions(
+            xs_scaled, ys_scaled, scaled_width, self.shorts_height,
+            self.shorts_width, self.shorts_height
+        )[:, 0]
+        
+        # Write a sendcmd script that moves the crop window over time,
+        # only emitting a command when the window actually moves
+        crop_name = f"crop@track{clip_id}"
+        changed = np.flatnonzero(np.diff(crop_xs, prepend=crop_xs[0] - 1))
+        cmd_path = self.output_dir / f"clip_{clip_id}_track.cmd"
+        cmd_path.write_text("".join(
+            f"{times[i]:.3f} {crop_name} x {crop_xs[i]};\n" for i in changed
+        ))
+        
+        video_filter = (
+            f"scale={scaled_width}:{self.shorts_height},"
+            f"sendcmd=f='{cmd_path.as_posix()}',"
+            f"{crop_name}={self.shorts_width}:{self.shorts_height}:{crop_xs[0]}:0,"
+            f"setsar=1"
+        )
+        return video_filter, cmd_path
     
-    def _format_simple_center_crop(self, video_path: str, output_path: Path) -> str:
-        """Simple center crop without tracking"""
-        try:
-            filter_complex = (
-                f"scale=-1:{self.shorts_height},"
-                f"crop={self.shorts_width}:{self.shorts_height}:"
-                f"(iw-{self.shorts_width})/2:(ih-{self.shorts_height})/2,"
-                f"scale={self.shorts_width}:{self.shorts_height},"
-                f"setsar=1"
-            )
-            
-            cmd = [
-                "ffmpeg",
-                "-i", video_path,
-                "-vf", filter_complex,
-                "-c:v", "libx264",
-                "-preset", "medium",
-                "-crf", "23",
-                "-profile:v", "high",
-                "-level", "4.0",
-                "-c:a", "aac",
-                "-b:a", "128k",
-                "-ar", "44100",
-                "-movflags", "+faststart",
-                "-y",
-                str(output_path)
-            ]
-            
-            subprocess.run(
-                cmd,
-                stdout=subprocess.DEVNULL,
-                stderr=subprocess.DEVNULL,
-                check=True
-            )
-            
-            if output_path.exists():
-                try:
-                    os.remove(video_path)
-                except:
-                    pass
-                return str(output_path)
-            return ""
-        except Exception as e:
-            print(f"Simple crop error: {e}")
-            return ""
+    def _acquire_tracker(self) -> "PlayerTracker":
+        """Borrow an idle tracker, creating one if all are in use"""
+        with self._tracker_lock:
+            if self._idle_trackers:
+                return self._idle_trackers.pop()
+        return PlayerTracker()
     
-    def _format_with_ball_tracking(self, video_path: str, output_path: Path, clip_id: int) -> str:
-        """Format with player tracking - dynamic crop that follows the player with the ball"""
-        try:
-            print(f"Tracking player with ball in clip {clip_id}...")
-            
-            # Track player positions
-            player_positions = self.tracker.track_player_with_ball(video_path, start_time=0, 
-                                                                   duration=self.clip_duration)
-            
-            if not player_positions:
-                print("No player detected, using center crop")
-                return self._format_simple_center_crop(video_path, output_path)
-            
-            # Load video with MoviePy
-            clip = VideoFileClip(video_path)
-            original_width, original_height = clip.size
-            fps = clip.fps
-            
-            # Scale factor to fit height
-            scale_factor = self.shorts_height / original_height
-            scaled_width = int(original_width * scale_factor)
-            
-            # Frame counter for tracking
-            frame_counter = [0]
-            
-            # Function to crop frame based on ball position
-            def make_frame(frame):
-                # Calculate current time from frame number
-                current_time = frame_counter[0] / fps
-                frame_counter[0] += 1
-                
-                # Find closest player position for this time
-                if player_positions:
-                    closest_pos = min(player_positions, key=lambda x: abs(x[0] - current_time))
-                    _, player_x, player_y = closest_pos
-                else:
-                    # Fallback to center
-                    player_x, player_y = original_width // 2, original_height // 2
-                
-                # Scale frame
-                frame_scaled = cv2.resize(frame, (scaled_width, self.shorts_height))
-                
-                # Calculate crop region centered on player (offset slightly upward)
-                player_x_scaled = int(player_x * scale_factor)
-                player_y_scaled = int(player_y * scale_factor)
-                offset_y = int(self.shorts_height * 0.1)  # Shift up 10% for better player framing
-                
-                crop_x = max(0, min(player_x_scaled - self.shorts_width // 2, 
-                                   scaled_width - self.shorts_width))
-                crop_y = max(0, min(player_y_scaled - self.shorts_height // 2 - offset_y, 
-                                   self.shorts_height - self.shorts_height))
-                
-                # Crop
-                frame_cropped = frame_scaled[crop_y:crop_y+self.shorts_height, 
-                                            crop_x:crop_x+self.shorts_width]
-                
-                # If crop is smaller than target, pad it
-                if frame_cropped.shape[0] < self.shorts_height or \
-                   frame_cropped.shape[1] < self.shorts_width:
-                    padded = np.zeros((self.shorts_height, self.shorts_width, 3), 
-                                    dtype=np.uint8)
-                    h, w = frame_cropped.shape[:2]
-                    y_offset = (self.shorts_height - h) // 2
-                    x_offset = (self.shorts_width - w) // 2
-                    padded[y_offset:y_offset+h, x_offset:x_offset+w] = frame_cropped
-                    frame_cropped = padded
-                
-                return frame_cropped
-            
-            # Create new clip with tracked cropping using fl_image
-            tracked_clip = clip.fl_image(make_frame)
+    def _release_tracker(self, tracker: "PlayerTracker"):
+        """Return a borrowed tracker to the pool"""
+        with self._tracker_lock:
+            self._idle_trackers.append(tracker)
+    
+    def _shorts_filter(self, video_path: str, timestamp: float, clip_id: int, duration: float,
+                       source_size: Optional[Tuple[int, int]] = None
+                       ) -> Tuple[str, Optional[Path]]:
+        """
+        Build the shorts filter chain for one clip (ball tracking or center crop)
+        
+        Returns:
+            (filter chain, sendcmd script path or None)
+        """
+        if self.enable_ball_tracking and self.tracker:
+            try:
+                if source_size is None:
+                    source_size = self._probe_size(video_path)
+                tracked = self._tracking_filter(video_path, timestamp, clip_id, duration,
+                                                source_size)
+                if tracked:
+                    return tracked
+            except Exception as e:
+                print(f"Player tracking error: {e}, falling back to center crop")
+        
+        return self._center_crop_filter(), None
+    
+    def _output_args(self) -> List[str]:
+        """FFmpeg output options shared by every shorts output"""
+        return [
+            *self._encoder_args(),
+            "-profile:v", "high",
+            "-level", "4.0",
+            # Audio is re-encoded here because the seek rarely lands on an AAC
+            # frame boundary; later stages copy it (keeping the source rate)
+            "-c:a", "aac",
+            "-b:a", "128k",
+            "-movflags", "+faststart"
+        ]
+    
+    def _encode_shorts(self, video_path: str, jobs: List[Tuple[float, str, Path]],
+                       duration: float):
+        """
+        Cut, format and encode shorts from one source, waiting for FFmpeg to finish
+        
+        Raises:
+            subprocess.CalledProcessError: If FFmpeg fails
+        """
+        proc = self._start_encode(video_path, jobs, duration)
+        if proc.wait() != 0:
+            raise subprocess.CalledProcessError(proc.returncode, proc.args)
+    
+    def _start_encode(self, video_path: str, jobs: List[Tuple[float, str, Path]],
+                      duration: float) -> subprocess.Popen:
+        """
+        Start cutting, formatting and encoding shorts in a single FFmpeg run
+        
+        Each job is its own input with an accurate seek to its start time, and
+        its filter chain feeds a labeled output in one filter graph.
+        
+        Args:
+            video_path: Path to source video
+            jobs: List of (start time, filter chain, output path)
+            duration: Clip duration in seconds
             
-            # Write output
-            tracked_clip.write_videofile(
-                str(output_path),
-                codec='libx264',
-                audio_codec='aac',
-                bitrate='8000k',
-                preset='medium',
-                audio_bitrate='128k',
-                verbose=False,
-                logger=None
-            )
+        Returns:
+            The running FFmpeg process
+        """
+        cmd = ["ffmpeg", "-y"]  # Overwrite output files
+        for timestamp, _, _ in jobs:
+            cmd += [*self._decoder_args(), "-ss", str(timestamp), "-t", str(duration),
+                    "-i", video_path]
+        
+        cmd += ["-filter_complex", ";".join(
+            f"[{i}:v]{video_filter}[v{i}]" for i, (_, video_filter, _) in enumerate(jobs)
+        )]
+        
+        for i, (_, _, output_path) in enumerate(jobs):
+            cmd += ["-map", f"[v{i}]", "-map", f"{i}:a?", *self._output_args(),
+                    str(output_path)]
+        
+        # Run FFmpeg with suppressed output, without waiting for it
+        return subprocess.Popen(
+            cmd,
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL
+        )
+    
+    def submit_clip(self, video_path: str, timestamp: float, clip_id: int, pending: List,
+                    duration: float = None) -> Path:
+        """
+        Start creating a clip and return without waiting for the encode
+        
+        Collect the results with flush_pending(pending).
+        
+        Args:
+            video_path: Path to source video
+            timestamp: Start time in seconds
+            clip_id: Unique identifier for the clip
+            pending: Caller-owned list the started encode is added to (the
+                clipper is shared between sessions, so it keeps none itself)
+            duration: Clip duration (default: 30s)
             
-            # Cleanup
-            clip.close()
-            tracked_clip.close()
+        Returns:
+            Path the clip will be written to
+        """
+        if duration is None:
+            duration = self.clip_duration
+        
+        video_filter, cmd_path = self._shorts_filter(video_path, timestamp, clip_id, duration)
+        return self._submit_encode(video_path, timestamp, clip_id, duration,
+                                   video_filter, cmd_path, pending)
+    
+    def _submit_encode(self, video_path: str, timestamp: float, clip_id: int, duration: float,
+                       video_filter: str, cmd_path: Optional[Path], pending: List) -> Path:
+        """Start a clip's encode, waiting first if all NVENC sessions are busy"""
+        while True:
+            running = [proc for proc, _, _ in pending if proc.poll() is None]
+            if len(running) < self.nvenc_sessions:
+                break
+            running[0].wait()
+        
+        output_path = self.output_dir / f"clip_{clip_id}_shorts.mp4"
+        proc = self._start_encode(video_path, [(timestamp, video_filter, output_path)], duration)
+        pending.append((proc, output_path, {
+            "clip_id": clip_id,
+            "video_path": video_path,
+            "timestamp": timestamp,
+            "duration": duration,
+            "cmd_path": cmd_path
+        }))
+        return output_path
+    
+    def flush_pending(self, pending: List) -> List[Tuple[int, str]]:
+        """
+        Wait for submitted clips to finish encoding
+        
+        Args:
+            pending: List of encodes filled by submit_clip; emptied
             
-            if output_path.exists():
-                try:
-                    os.remove(video_path)
-                except:
-                    pass
-                return str(output_path)
-            return ""
+        Returns:
+            List of (clip id, clip path) in submission order; the path is an
+            empty string if the clip failed
+        """
+        results = []
+        jobs = list(pending)
+        pending.clear()
+        
+        for proc, output_path, info in jobs:
+            cmd_path = info["cmd_path"]
+            try:
+                if proc.wait() != 0:
+                    if cmd_path is None:
+                        raise subprocess.CalledProcessError(proc.returncode, proc.args)
+                    # Fallback to simple center crop
+                    print(f"Player tracking error: ffmpeg exited with {proc.returncode}, "
+                          f"falling back to center crop")
+                    self._encode_shorts(
+                        info["video_path"],
+                        [(info["timestamp"], self._center_crop_filter(), output_path)],
+                        info["duration"]
+                    )
+                clip_path = str(output_path) if output_path.exists() else ""
+            except subprocess.CalledProcessError as e:
+                print(f"Clip creation error: {e}")
+                clip_path = ""
+            finally:
+                if cmd_path is not None:
+                    cmd_path.unlink(missing_ok=True)
             
-        except Exception as e:
-            print(f"Player tracking error: {e}, falling back to center crop")
-            if 'clip' in locals():
-                clip.close()
-            return self._format_simple_center_crop(video_path, output_path)
+            results.append((info["clip_id"], clip_path))
+        
+        return results
     
-    def create_all_clips(self, video_path: str, highlights: List[Dict]) -> List[Dict]:
+    def create_all_clips(self, video_path: str, highlights: List[Dict],
+                         duration: float = None) -> List[Dict]:
         """
         Create clips for all highlights
         
         Args:
             video_path: Path to source video
             highlights: List of highlight dictionaries
+            duration: Clip duration (default: 30s)
             
         Returns:
             List of clips with metadata
         """
+        if duration is None:
+            duration = self.clip_duration
+        
         clips = []
+        pending = []
+        source_size = self._probe_size(video_path)
+        
+        # Track clips concurrently and start each encode as soon as its crop
+        # is ready; running encodes are bounded by the number of NVENC sessions
+        max_workers = max(1, min(len(highlights), self.nvenc_sessions))
+        with ThreadPoolExecutor(max_workers=max_workers) as pool:
+            futures = {
+                pool.submit(self._shorts_filter, video_path, highlight.get("timestamp", 0), idx,
+                            duration, source_size): idx
+                for idx, highlight in enumerate(highlights)
+            }
+            for future in as_completed(futures):
+                idx = futures[future]
+                video_filter, cmd_path = future.result()
+                self._submit_encode(video_path, highlights[idx].get("timestamp", 0), idx,
+                                    duration, video_filter, cmd_path, pending)
+        
+        clip_paths = dict(self.flush_pending(pending))
         
         for idx, highlight in enumerate(highlights):
-            timestamp = highlight.get("timestamp", 0)
-            
-            # Create clip
-            clip_path = self.create_clip(video_path, timestamp, idx)
+            clip_path = clip_paths[idx]
             
             if clip_path:
                 clips.append({
                     "id": idx,
                     "path": clip_path,
-                    "timestamp": timestamp,
+                    "timestamp": highlight.get("timestamp", 0),
                     "description": highlight.get("description", ""),
                     "score": highlight.get("score", 0)
                 })
         
         return clips
-
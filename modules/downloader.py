@@ -3,6 +3,7 @@ YouTube Video Downloader Module
 Downloads videos from YouTube using yt-dlp
 """
 
+import json
 import os
 import subprocess
 from pathlib import Path
@@ -47,6 +48,7 @@ class VideoDownloader:
                 "yt-dlp",
                 "-f", "bestvideo[ext=mp4]+bestaudio[ext=m4a]/best[ext=mp4]/best",
                 "--merge-output-format", "mp4",
+                "--write-info-json",  # Title etc. readable without the network
                 "-o", str(output_path),
                 "--no-playlist",
                 url
@@ -72,22 +74,29 @@ class VideoDownloader:
             print(f"Unexpected error during download: {e}")
             return None
     
-    def get_video_info(self, url: str) -> dict:
+    def get_video_info(self, url_or_path: str, local: bool = False) -> dict:
         """
-        Get video metadata without downloading
+        Get video metadata
+        
+        Downloaded files are probed locally with ffprobe (no network request);
+        URLs are looked up with yt-dlp without downloading.
         
         Args:
-            url: YouTube video URL
+            url_or_path: YouTube video URL or path to a downloaded video
+            local: Force reading metadata from a local file
             
         Returns:
-            Dictionary with video info (title, duration, etc.)
+            Dictionary with video info (title, duration, width, height, etc.)
         """
+        if local or os.path.exists(url_or_path):
+            return self._probe_local(url_or_path)
+        
         try:
             cmd = [
                 "yt-dlp",
                 "--dump-json",
                 "--no-playlist",
-                url
+                url_or_path
             ]
             
             process = subprocess.run(
@@ -97,10 +106,61 @@ class VideoDownloader:
                 check=True
             )
             
-            import json
             return json.loads(process.stdout)
             
         except Exception as e:
             print(f"Error getting video info: {e}")
             return {}
-
+    
+    def _probe_local(self, path: str) -> dict:
+        """
+        Read metadata of a local video with ffprobe
+        
+        Args:
+            path: Path to video file
+            
+        Returns:
+            Dictionary with title, duration, width and height (same keys as
+            yt-dlp's info), plus the raw ffprobe format and streams
+        """
+        try:
+            cmd = [
+                "ffprobe",
+                "-v", "quiet",
+                "-print_format", "json",
+                "-show_format",
+                "-show_streams",
+                path
+            ]
+            
+            process = subprocess.run(
+                cmd,
+                capture_output=True,
+                text=True,
+                check=True
+            )
+            
+            probe = json.loads(process.stdout)
+            fmt = probe.get("format", {})
+            streams = probe.get("streams", [])
+            video = next((s for s in streams if s.get("codec_type") == "video"), {})
+            
+            # Title comes from the info file yt-dlp wrote next to the video
+            title = fmt.get("tags", {}).get("title")
+            info_path = Path(path).with_suffix(".info.json")
+            if not title and info_path.exists():
+                with open(info_path, "r", encoding="utf-8") as f:
+                    title = json.load(f).get("title")
+            
+            return {
+                "title": title or Path(path).stem,
+                "duration": float(fmt.get("duration", 0)),
+                "width": video.get("width"),
+                "height": video.get("height"),
+                "format": fmt,
+                "streams": streams
+            }
+            
+        except Exception as e:
+            print(f"Error getting video info: {e}")
+            return {}
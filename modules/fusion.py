@@ -3,6 +3,9 @@ Fusion Logic Module
 Combines text and visual highlight detections
 """
 
+from bisect import bisect_left, bisect_right
+from heapq import nlargest
+from operator import itemgetter
 from typing import List, Dict
 import json
 
@@ -34,6 +37,12 @@ class HighlightFusion:
         used_text_indices = set()
         used_visual_indices = set()
         
+        # Visual highlights sorted by time, so each text highlight only looks
+        # at the visual highlights inside its time window
+        visual_order = sorted(range(len(visual_highlights)),
+                              key=lambda j: visual_highlights[j].get("timestamp", 0))
+        visual_times = [visual_highlights[j].get("timestamp", 0) for j in visual_order]
+        
         # First, try to merge overlapping highlights
         for i, text_hl in enumerate(text_highlights):
             text_time = text_hl.get("timestamp", 0)
@@ -41,17 +50,19 @@ class HighlightFusion:
             best_match_idx = None
             best_match_score = 0
             
-            for j, visual_hl in enumerate(visual_highlights):
-                visual_time = visual_hl.get("timestamp", 0)
+            # Visual highlights within threshold
+            lo = bisect_left(visual_times, text_time - self.overlap_threshold)
+            hi = bisect_right(visual_times, text_time + self.overlap_threshold)
+            
+            for j in sorted(visual_order[lo:hi]):
+                visual_hl = visual_highlights[j]
+                
+                # Combined score
+                combined_score = text_hl.get("score", 5) + visual_hl.get("score", 0.5) * 2
                 
-                # Check if within threshold
-                if abs(text_time - visual_time) <= self.overlap_threshold:
-                    # Combined score
-                    combined_score = text_hl.get("score", 5) + visual_hl.get("score", 0.5) * 2
-                    
-                    if combined_score > best_match_score:
-                        best_match_score = combined_score
-                        best_match_idx = j
+                if combined_score > best_match_score:
+                    best_match_score = combined_score
+                    best_match_idx = j
             
             # Create fused highlight
             if best_match_idx is not None and best_match_idx not in used_visual_indices:
@@ -92,9 +103,8 @@ class HighlightFusion:
                     "visual_score": visual_hl.get("score", 0.5)
                 })
         
-        # Sort by score and return top highlights
-        fused.sort(key=lambda x: x.get("score", 0), reverse=True)
-        return fused[:5]  # Return top 5 final highlights
+        # Return top 5 final highlights by score
+        return nlargest(5, fused, key=itemgetter("score"))
     
     def save_fused_highlights(self, highlights: List[Dict], output_path: str):
         """
@@ -3,23 +3,36 @@ Text-based Highlight Detection Module
 Uses DeepSeek API to analyze transcripts and find exciting moments
 """
 
+import hashlib
 import json
 import os
+from pathlib import Path
 import requests
+from requests.adapters import HTTPAdapter
 from typing import Dict, List, Optional
 from dotenv import load_dotenv
 
 load_dotenv()
 
+# Shared HTTP session so repeated API calls reuse the TLS connection
+_SESSION = requests.Session()
+_SESSION.mount("https://", HTTPAdapter(pool_connections=4, pool_maxsize=4))
+
 
 class HighlightFinder:
     """Finds highlights in transcripts using AI analysis"""
     
-    def __init__(self):
-        """Initialize the highlight finder"""
+    def __init__(self, cache_dir: str = "output/.hl_cache"):
+        """
+        Initialize the highlight finder
+        
+        Args:
+            cache_dir: Directory for cached API results
+        """
         self.api_key = os.getenv("OPENROUTER_API_KEY")
         self.model = os.getenv("DEEPSEEK_MODEL", "deepseek/deepseek-chat")
         self.api_url = "https://openrouter.ai/api/v1/chat/completions"
+        self.cache_dir = Path(cache_dir)
     
     def find_highlights(self, transcript: Dict, top_k: int = 5) -> List[Dict]:
         """
@@ -58,8 +71,14 @@ Return ONLY a valid JSON array in this exact format:
 
 Be selective - only include truly exciting plays like dunks, game-winners, amazing assists, blocks, or clutch moments."""
 
+            # Reuse a previous result for the same model and prompt
+            cache_path = self._cache_path(prompt)
+            if cache_path.exists():
+                with open(cache_path, 'r', encoding='utf-8') as f:
+                    return json.load(f)[:top_k]
+            
             # Call DeepSeek API
-            response = requests.post(
+            response = _SESSION.post(
                 self.api_url,
                 headers={
                     "Authorization": f"Bearer {self.api_key}",
@@ -92,6 +111,10 @@ Be selective - only include truly exciting plays like dunks, game-winners, amazi
             
             # Validate and return
             if isinstance(highlights, list):
+                if highlights:
+                    self.cache_dir.mkdir(parents=True, exist_ok=True)
+                    with open(cache_path, 'w', encoding='utf-8') as f:
+                        json.dump(highlights, f, ensure_ascii=False)
                 return highlights[:top_k]
             else:
                 return []
@@ -106,6 +129,11 @@ Be selective - only include truly exciting plays like dunks, game-winners, amazi
             print(f"Unexpected error finding highlights: {e}")
             return []
     
+    def _cache_path(self, prompt: str) -> Path:
+        """Cache file for an API result, keyed by a hash of model and prompt"""
+        key = hashlib.blake2b(f"{self.model}\n{prompt}".encode("utf-8"), digest_size=16)
+        return self.cache_dir / f"{key.hexdigest()}.json"
+    
     def _format_segments(self, segments: List[Dict]) -> str:
         """
         Format transcript segments for the prompt
@@ -116,11 +144,7 @@ Be selective - only include truly exciting plays like dunks, game-winners, amazi
         Returns:
             Formatted string
         """
-        formatted = []
-        for seg in segments:
-            start_time = seg.get("start", 0)
-            text = seg.get("text", "").strip()
-            formatted.append(f"[{start_time:.1f}s] {text}")
-        
-        return "\n".join(formatted)
+        return "\n".join(
+            f"[{seg.get('start', 0):.1f}s] {seg.get('text', '').strip()}" for seg in segments
+        )
 
@@ -1,29 +1,68 @@
 """
 Caption and Overlay Module
-Adds subtitles and title overlays to clips using MoviePy
+Adds subtitles and title overlays to clips using FFmpeg (libass)
 """
 
+from functools import lru_cache
 from pathlib import Path
-from moviepy.video.io.VideoFileClip import VideoFileClip
-from moviepy.video.tools.credits import TextClip
-from moviepy.video.compositing.CompositeVideoClip import CompositeVideoClip
 from typing import Dict, List, Optional
+import json
 import os
+import subprocess
+
+from modules.clipper import nvenc_available
+
+# ASS colours (&HAABBGGRR) for the supported caption colours
+ASS_COLORS = {
+    "white": "&H00FFFFFF",
+    "black": "&H00000000",
+    "yellow": "&H0000FFFF",
+    "red": "&H000000FF",
+}
+
+
+@lru_cache(maxsize=64)
+def _probe(path: str, mtime: float) -> Dict:
+    """
+    Read container and stream metadata of a video with ffprobe
+    
+    Cached per path; mtime is part of the key so rewritten files are re-probed.
+    """
+    return json.loads(subprocess.check_output([
+        "ffprobe", "-v", "quiet",
+        "-print_format", "json",
+        "-show_streams", "-show_format",
+        path
+    ]))
 
 
 class CaptionOverlay:
     """Adds captions and overlays to video clips"""
     
-    def __init__(self, font_size: int = 40, font_color: str = "white"):
+    def __init__(self, font_size: int = 40, font_color: str = "white", hw_accel: str = "cuda"):
         """
         Initialize the overlay tool
         
         Args:
             font_size: Size of caption text
             font_color: Color of caption text
+            hw_accel: Hardware acceleration to use ("cuda" for NVDEC/NVENC when
+                available, "" to always encode with libx264)
         """
         self.font_size = font_size
         self.font_color = font_color
+        self.use_nvenc = hw_accel == "cuda" and nvenc_available()
+    
+    def _decoder_args(self) -> List[str]:
+        """FFmpeg input options for hardware decoding"""
+        return ["-hwaccel", "cuda"] if self.use_nvenc else []
+    
+    def _encoder_args(self) -> List[str]:
+        """FFmpeg output options for H.264 encoding (NVENC or libx264)"""
+        if self.use_nvenc:
+            return ["-c:v", "h264_nvenc", "-preset", "p4", "-tune", "hq",
+                    "-rc", "vbr", "-cq", "23"]
+        return ["-c:v", "libx264", "-preset", "medium", "-crf", "23"]
     
     def add_title(self, video_path: str, title: str, output_path: str, 
                   duration: float = 3.0) -> str:
@@ -39,36 +78,8 @@ class CaptionOverlay:
             Path to output video with title
         """
         try:
-            video = VideoFileClip(video_path)
-            
-            # Create title text clip
-            txt_clip = TextClip(
-                title,
-                fontsize=self.font_size,
-                color=self.font_color,
-                font='Arial-Bold',
-                stroke_color='black',
-                stroke_width=2
-            ).set_duration(duration).set_position('center')
-            
-            # Composite with video
-            final = CompositeVideoClip([video, txt_clip.set_start(0)])
-            final.write_videofile(
-                output_path,
-                codec='libx264',
-                audio_codec='aac',
-                temp_audiofile='temp-audio.m4a',
-                remove_temp=True,
-                verbose=False,
-                logger=None
-            )
-            
-            # Clean up
-            video.close()
-            final.close()
-            
-            return output_path
-            
+            return self._apply_overlays(video_path, output_path, title=title,
+                                        title_duration=duration)
         except Exception as e:
             print(f"Title overlay error: {e}")
             return video_path  # Return original if failed
@@ -87,64 +98,149 @@ class CaptionOverlay:
             Path to output video with subtitles
         """
         try:
-            video = VideoFileClip(video_path)
+            return self._apply_overlays(video_path, output_path,
+                                        transcript_segments=transcript_segments)
+        except Exception as e:
+            print(f"Subtitle overlay error: {e}")
+            return video_path  # Return original if failed
+    
+    def _apply_overlays(self, video_path: str, output_path: str, title: Optional[str] = None,
+                        transcript_segments: Optional[List[Dict]] = None,
+                        title_duration: float = 3.0) -> str:
+        """
+        Burn a title and/or subtitles into a video in a single FFmpeg pass
+        
+        Args:
+            video_path: Path to input video
+            output_path: Path to save output video
+            title: Title text shown centered at the start (None for no title)
+            transcript_segments: Transcript segments for subtitles (None for no subtitles)
+            title_duration: How long to show title (seconds)
             
-            # Find relevant segments for this clip
-            clip_duration = video.duration
+        Returns:
+            Path to output video
+        """
+        meta = _probe(video_path, os.path.getmtime(video_path))
+        clip_duration = float(meta["format"]["duration"])
+        video = next(st for st in meta["streams"] if st.get("codec_type") == "video")
+        
+        # Find relevant segments for this clip
+        relevant_segments = []
+        if transcript_segments is not None:
             relevant_segments = [
                 seg for seg in transcript_segments
                 if 0 <= seg.get("start", 0) < clip_duration
             ]
+        
+        # Write title and captions as one ASS script and let FFmpeg (libass)
+        # render everything while encoding
+        ass_path = Path(output_path).with_suffix(".ass")
+        ass_path.write_text(
+            self._segments_to_ass(relevant_segments, int(video["width"]), int(video["height"]),
+                                  clip_duration, title=title, title_duration=title_duration),
+            encoding="utf-8"
+        )
+        
+        try:
+            cmd = [
+                "ffmpeg", "-y",
+                *self._decoder_args(),
+                "-i", video_path,
+                "-vf", f"ass=filename='{ass_path.as_posix()}'",
+                "-map", "0:v",
+                "-map", "0:a?",
+                *self._encoder_args(),
+                "-c:a", "copy",
+                "-movflags", "+faststart",
+                output_path
+            ]
             
-            # Create text clips for each segment
-            text_clips = []
-            for seg in relevant_segments:
-                start = seg.get("start", 0)
-                end = seg.get("end", clip_duration)
-                text = seg.get("text", "").strip()
-                
-                if text and 0 <= start < clip_duration:
-                    txt_clip = TextClip(
-                        text,
-                        fontsize=self.font_size,
-                        color=self.font_color,
-                        font='Arial',
-                        stroke_color='black',
-                        stroke_width=2,
-                        bg_color='black',
-                        size=(video.w, None),
-                        method='caption'
-                    ).set_duration(end - start).set_position(('center', 'bottom')).set_start(start)
-                    
-                    text_clips.append(txt_clip)
-            
-            # Composite video with subtitles
-            if text_clips:
-                final = CompositeVideoClip([video] + text_clips)
-            else:
-                final = video
-            
-            final.write_videofile(
-                output_path,
-                codec='libx264',
-                audio_codec='aac',
-                temp_audiofile='temp-audio.m4a',
-                remove_temp=True,
-                verbose=False,
-                logger=None
+            # Run FFmpeg with suppressed output
+            subprocess.run(
+                cmd,
+                stdout=subprocess.DEVNULL,
+                stderr=subprocess.DEVNULL,
+                check=True
             )
+        finally:
+            ass_path.unlink(missing_ok=True)
+        
+        return output_path
+    
+    def _segments_to_ass(self, segments: List[Dict], width: int, height: int,
+                         clip_duration: float, title: Optional[str] = None,
+                         title_duration: float = 3.0) -> str:
+        """
+        Build an ASS subtitle script with the title and captions
+        
+        Args:
+            segments: Transcript segments with start/end times
+            width: Video width (script resolution)
+            height: Video height (script resolution)
+            clip_duration: Clip duration (default caption end time)
+            title: Title text shown centered at the start (None for no title)
+            title_duration: How long to show title (seconds)
             
-            # Clean up
-            video.close()
-            final.close()
-            for clip in text_clips:
-                clip.close()
-            
-            return output_path
-            
-        except Exception as e:
-            print(f"Subtitle overlay error: {e}")
-            return video_path  # Return original if failed
+        Returns:
+            ASS file contents
+        """
+        color = ASS_COLORS.get(self.font_color, ASS_COLORS["white"])
+        black = ASS_COLORS["black"]
+        
+        # Captions: outlined text on a black box at the bottom center;
+        # title: bold outlined text in the middle of the frame
+        lines = [
+            "[Script Info]",
+            "ScriptType: v4.00+",
+            f"PlayResX: {width}",
+            f"PlayResY: {height}",
+            "WrapStyle: 0",
+            "ScaledBorderAndShadow: yes",
+            "",
+            "[V4+ Styles]",
+            "Format: Name, Fontname, Fontsize, PrimaryColour, SecondaryColour, OutlineColour, "
+            "BackColour, Bold, Italic, Underline, StrikeOut, ScaleX, ScaleY, Spacing, Angle, "
+            "BorderStyle, Outline, Shadow, Alignment, MarginL, MarginR, MarginV, Encoding",
+            f"Style: Caption,Arial,{self.font_size},{color},{color},{black},{black},"
+            f"0,0,0,0,100,100,0,0,3,2,0,2,10,10,10,1",
+            f"Style: Title,Arial,{self.font_size},{color},{color},{black},{black},"
+            f"-1,0,0,0,100,100,0,0,1,2,0,5,10,10,10,1",
+            "",
+            "[Events]",
+            "Format: Layer, Start, End, Style, Name, MarginL, MarginR, MarginV, Effect, Text"
+        ]
+        
+        if title:
+            lines.append(
+                f"Dialogue: 1,{self._ass_time(0)},{self._ass_time(title_duration)},"
+                f"Title,,0,0,0,,{self._ass_text(title)}"
+            )
+        
+        for seg in segments:
+            text = seg.get("text", "").strip()
+            if not text:
+                continue
+            start = seg.get("start", 0)
+            end = seg.get("end", clip_duration)
+            lines.append(
+                f"Dialogue: 0,{self._ass_time(start)},{self._ass_time(end)},"
+                f"Caption,,0,0,0,,{self._ass_text(text)}"
+            )
+        
+        return "\n".join(lines) + "\n"
+    
+    def _ass_time(self, seconds: float) -> str:
+        """Format seconds as an ASS timestamp (H:MM:SS.cc)"""
+        centis = int(round(seconds * 100))
+        hours, centis = divmod(centis, 360000)
+        minutes, centis = divmod(centis, 6000)
+        secs, centis = divmod(centis, 100)
+        return f"{hours:d}:{minutes:02d}:{secs:02d}.{centis:02d}"
+    
+    def _ass_text(self, text: str) -> str:
+        """Escape text for an ASS dialogue line (braces start override tags)"""
+        return (text.replace("{", "(").replace("}", ")")
+                    .replace("\r", "").replace("\n", "\\N"))
     
     def process_clip(self, clip_path: str, clip_metadata: Dict, 
                      transcript_segments: List[Dict], add_title: bool = True,
@@ -162,18 +258,20 @@ class CaptionOverlay:
         Returns:
             Path to processed clip
         """
-        output_path = clip_path.replace(".mp4", "_final.mp4")
-        current_path = clip_path
-        
-        # Add title first
-        if add_title:
-            title = clip_metadata.get("description", "NBA Highlight")
-            current_path = self.add_title(current_path, title, output_path, duration=3)
+        if not add_title and not add_subtitles:
+            return clip_path
         
-        # Add subtitles
-        if add_subtitles:
-            final_output = current_path.replace("_final.mp4", "_with_subs.mp4")
-            current_path = self.add_subtitles(current_path, transcript_segments, final_output)
+        output_path = clip_path.replace(".mp4", "_final.mp4")
+        title = clip_metadata.get("description", "NBA Highlight") if add_title else None
         
-        return current_path if current_path != clip_path else clip_path
-
+        # Title and subtitles are burned in together in one encode
+        try:
+            return self._apply_overlays(
+                clip_path, output_path,
+                title=title,
+                transcript_segments=transcript_segments if add_subtitles else None,
+                title_duration=3
+            )
+        except Exception as e:
+            print(f"Overlay error: {e}")
+            return clip_path  # Return original if failed
@@ -1,32 +1,176 @@
 """
 Audio Transcription Module
-Uses OpenAI Whisper to transcribe video audio with timestamps
+Uses Whisper (faster-whisper batched inference, or OpenAI Whisper) to
+transcribe video audio with timestamps
 """
 
+import gc
+import hashlib
 import json
-import whisper
+import os
+import subprocess
+import tempfile
+import threading
+from functools import lru_cache
 from pathlib import Path
-from typing import Dict, List, Optional
+from typing import Dict, List, Optional, Tuple
+
+try:
+    import ctranslate2
+    from faster_whisper import WhisperModel, BatchedInferencePipeline
+    FASTER_WHISPER_AVAILABLE = True
+except ImportError:
+    FASTER_WHISPER_AVAILABLE = False
+
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
+
+try:
+    import whisper
+    WHISPER_AVAILABLE = True
+except ImportError:
+    WHISPER_AVAILABLE = False
+
+
+# Loaded models are shared by every AudioTranscriber in the process (module
+# state survives Streamlit reruns), so weights are only read from disk once
+@lru_cache(maxsize=4)
+def _get_faster_whisper(model_size: str, device: str, compute_type: str):
+    """Load a faster-whisper model and its batched pipeline"""
+    model = WhisperModel(model_size, device=device, compute_type=compute_type)
+    return model, BatchedInferencePipeline(model=model)
+
+
+@lru_cache(maxsize=4)
+def _get_whisper(model_size: str, device: str):
+    """Load an OpenAI Whisper model"""
+    return whisper.load_model(model_size, device=device)
+
+
+def _fingerprint(path: str, chunk_size: int = 1 << 20) -> str:
+    """
+    Cheap content fingerprint of a file: its size plus the first and last MB
+    
+    Args:
+        path: Path to file
+        chunk_size: Bytes hashed from each end
+        
+    Returns:
+        Hex digest
+    """
+    size = os.path.getsize(path)
+    digest = hashlib.blake2b(size.to_bytes(8, "little"), digest_size=16)
+    with open(path, "rb") as f:
+        digest.update(f.read(chunk_size))
+        if size > chunk_size:
+            f.seek(max(chunk_size, size - chunk_size))
+            digest.update(f.read(chunk_size))
+    return digest.hexdigest()
 
 
 class AudioTranscriber:
-    """Handles audio transcription using OpenAI Whisper"""
+    """Handles audio transcription using Whisper"""
     
-    def __init__(self, model_size: str = "base"):
+    def __init__(self, model_size: str = "base", batch_size: int = 16,
+                 cache_dir: str = "output/.cache"):
         """
         Initialize the transcriber
         
         Args:
             model_size: Whisper model size (tiny, base, small, medium, large)
+            batch_size: Number of audio chunks decoded together (faster-whisper only)
+            cache_dir: Directory for cached transcripts
         """
         self.model_size = model_size
+        self.batch_size = batch_size
+        self.cache_dir = Path(cache_dir)
+        
+        # Greedy decoding without temperature fallback or conditioning on the
+        # previous window - commentary transcripts barely change, decoding is
+        # several times faster
+        self.decode_options = {
+            "beam_size": 1,
+            "best_of": 1,
+            "temperature": 0.0,
+            "condition_on_previous_text": False,
+            "no_speech_threshold": 0.5
+        }
+        self.vad_parameters = {"min_silence_duration_ms": 500}
         self.model = None
+        self.pipeline = None
+        self.device = None
+        self.fp16 = False
+        self._load_lock = threading.Lock()
     
     def load_model(self):
-        """Load the Whisper model"""
-        if self.model is None:
-            print(f"Loading Whisper model: {self.model_size}")
-            self.model = whisper.load_model(self.model_size)
+        """Load the Whisper model (safe to call from several threads)"""
+        with self._load_lock:
+            if self.model is None:
+                print(f"Loading Whisper model: {self.model_size}")
+                if FASTER_WHISPER_AVAILABLE:
+                    device, compute_type = self._faster_whisper_device()
+                    self.model, self.pipeline = _get_faster_whisper(self.model_size, device,
+                                                                    compute_type)
+                    self.device = device
+                    print(f"Whisper running on {device} ({compute_type})")
+                else:
+                    import torch
+                    self.device = "cuda" if torch.cuda.is_available() else "cpu"
+                    self.fp16 = self.device == "cuda"
+                    self.model = _get_whisper(self.model_size, self.device)
+                    print(f"Whisper running on {self.device} "
+                          f"({'fp16' if self.fp16 else 'fp32'})")
+    
+    def _faster_whisper_device(self) -> Tuple[str, str]:
+        """Device and compute type for faster-whisper"""
+        # int8 weights on both devices (fp16 activations on GPU)
+        if ctranslate2.get_cuda_device_count() > 0:
+            return "cuda", "int8_float16"
+        return "cpu", "int8"
+    
+    def _settings_key(self) -> str:
+        """
+        Short hash of the settings besides the model size that change a
+        transcript (backend, precision, batching and decoding options)
+        """
+        if FASTER_WHISPER_AVAILABLE:
+            settings = {
+                "backend": "faster-whisper",
+                "compute_type": self._faster_whisper_device()[1],
+                "batch_size": self.batch_size,
+                "vad_parameters": self.vad_parameters
+            }
+        else:
+            import torch
+            settings = {"backend": "openai-whisper", "fp16": torch.cuda.is_available()}
+        settings["decode_options"] = self.decode_options
+        
+        encoded = json.dumps(settings, sort_keys=True).encode()
+        return hashlib.blake2b(encoded, digest_size=8).hexdigest()
+    
+    def unload(self):
+        """
+        Free the Whisper model's memory (GPU memory included)
+        
+        The shared model caches are cleared too, so the weights are really
+        released; the next load_model reads them from disk again.
+        """
+        with self._load_lock:
+            self.model = None
+            self.pipeline = None
+            _get_faster_whisper.cache_clear()
+            _get_whisper.cache_clear()
+            gc.collect()
+            
+            try:
+                import torch
+                if torch.cuda.is_available():
+                    torch.cuda.empty_cache()
+            except ImportError:
+                pass
     
     def transcribe(self, video_path: str) -> Dict:
         """
@@ -38,15 +182,67 @@ class AudioTranscriber:
         Returns:
             Dictionary with transcription and segments
         """
+        # Reuse a previous transcript of the same file contents, made with the
+        # same model and settings
+        try:
+            cache_name = f"{_fingerprint(video_path)}_{self.model_size}_{self._settings_key()}.json"
+            cache_path = self.cache_dir / cache_name
+            if cache_path.exists():
+                return self.load_transcript(str(cache_path))
+        except OSError as e:
+            print(f"Transcript cache unavailable: {e}")
+            cache_path = None
+        
+        transcript = self._transcribe(video_path)
+        
+        if cache_path is not None and transcript["segments"]:
+            try:
+                self.save_transcript(transcript, str(cache_path))
+            except OSError as e:
+                print(f"Could not cache transcript: {e}")
+        
+        return transcript
+    
+    def _transcribe(self, video_path: str) -> Dict:
+        """Run Whisper on a video (uncached)"""
         self.load_model()
         
+        wav_path = None
         try:
+            if self.pipeline is not None:
+                # Batched faster-whisper: decode many 30s chunks per forward pass.
+                # Silero VAD drops silence/crowd noise so the transcript only
+                # holds speech (less decoding here, fewer tokens for the LLM)
+                # (PyAV decodes only the audio stream of the video)
+                segments_iter, info = self.pipeline.transcribe(
+                    video_path,
+                    task="transcribe",
+                    batch_size=self.batch_size,
+                    word_timestamps=False,
+                    vad_filter=True,
+                    vad_parameters=self.vad_parameters,
+                    **self.decode_options
+                )
+                segments = [
+                    {"id": i, "start": seg.start, "end": seg.end, "text": seg.text}
+                    for i, seg in enumerate(segments_iter)
+                ]
+                
+                return {
+                    "text": "".join(seg["text"] for seg in segments),
+                    "segments": segments,
+                    "language": info.language
+                }
+            
             # Transcribe with timestamps
+            wav_path = self._extract_audio(video_path)
             result = self.model.transcribe(
-                video_path,
+                str(wav_path) if wav_path else video_path,
                 task="transcribe",
                 verbose=False,
-                word_timestamps=False
+                word_timestamps=False,
+                fp16=self.fp16,
+                **self.decode_options
             )
             
             return {
@@ -62,6 +258,42 @@ class AudioTranscriber:
                 "segments": [],
                 "language": "unknown"
             }
+        finally:
+            if wav_path is not None:
+                wav_path.unlink(missing_ok=True)
+    
+    def _extract_audio(self, video_path: str) -> Optional[Path]:
+        """
+        Extract 16 kHz mono audio to a temporary WAV for OpenAI Whisper
+        
+        Whisper only needs 16 kHz mono audio, so the model reads a small WAV
+        instead of demuxing the whole video. Each call gets its own file, so
+        concurrent runs on the same video don't collide.
+        
+        Returns:
+            Path to the WAV (the caller deletes it), or None if extraction failed
+        """
+        fd, wav_name = tempfile.mkstemp(suffix=".wav")
+        os.close(fd)
+        wav_path = Path(wav_name)
+        try:
+            subprocess.run(
+                [
+                    "ffmpeg", "-y", "-loglevel", "error",
+                    "-i", video_path,
+                    "-vn", "-ac", "1", "-ar", "16000",
+                    "-c:a", "pcm_s16le",
+                    str(wav_path)
+                ],
+                stdout=subprocess.DEVNULL,
+                stderr=subprocess.DEVNULL,
+                check=True
+            )
+            return wav_path
+        except (subprocess.CalledProcessError, FileNotFoundError) as e:
+            print(f"Audio extraction failed, transcribing the video directly: {e}")
+            wav_path.unlink(missing_ok=True)
+            return None
     
     def save_transcript(self, transcript: Dict, output_path: str):
         """
@@ -74,6 +306,12 @@ class AudioTranscriber:
         output_path = Path(output_path)
         output_path.parent.mkdir(parents=True, exist_ok=True)
         
+        if ORJSON_AVAILABLE:
+            # orjson always writes UTF-8 and serializes in C
+            output_path.write_bytes(orjson.dumps(
+                transcript, option=orjson.OPT_INDENT_2 | orjson.OPT_SERIALIZE_NUMPY))
+            return
+        
         with open(output_path, 'w', encoding='utf-8') as f:
             json.dump(transcript, f, indent=2, ensure_ascii=False)
     
@@ -87,6 +325,9 @@ class AudioTranscriber:
         Returns:
             Transcript dictionary
         """
+        if ORJSON_AVAILABLE:
+            return orjson.loads(Path(transcript_path).read_bytes())
+        
         with open(transcript_path, 'r', encoding='utf-8') as f:
             return json.load(f)
 
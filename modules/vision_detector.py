@@ -3,11 +3,20 @@ Visual Highlight Detection Module
 Uses CLIP to analyze video frames and detect visually exciting moments
 """
 
+import copy
+import gc
+import hashlib
+import queue
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
 import torch
 import cv2
 import numpy as np
+from pathlib import Path
 from PIL import Image
-from typing import List, Dict
+from typing import Iterator, List, Dict, Optional, Tuple
 
 try:
     import clip
@@ -15,22 +24,676 @@ try:
 except ImportError:
     CLIP_AVAILABLE = False
 
+try:
+    import onnxruntime as ort
+    from onnxruntime.quantization import quantize_dynamic, QuantType
+    ORT_AVAILABLE = True
+except ImportError:
+    ORT_AVAILABLE = False
+
+try:
+    from torchvision.transforms import v2
+    TV2_AVAILABLE = True
+except ImportError:
+    TV2_AVAILABLE = False
+
+try:
+    import av
+    PYAV_AVAILABLE = True
+except ImportError:
+    PYAV_AVAILABLE = False
+
+
+# The loaded CLIP model is shared by every VisionDetector in the process
+# (module state survives Streamlit reruns), so weights are only loaded once
+@lru_cache(maxsize=1)
+def _get_clip(model_name: str, device: str):
+    """Load a CLIP model and its preprocess transform"""
+    model, preprocess = clip.load(model_name, device=device)
+    model.eval()
+    return model, preprocess
+
 
 class VisionDetector:
     """Detects visually exciting moments using CLIP"""
     
-    def __init__(self):
-        """Initialize the vision detector"""
+    CLIP_MODEL = "ViT-B/32"
+    
+    # CLIP's input normalization
+    CLIP_MEAN = (0.48145466, 0.4578275, 0.40821073)
+    CLIP_STD = (0.26862954, 0.26130258, 0.27577711)
+    
+    # NBA action keywords for CLIP
+    EXCITING_TEXTS = [
+        "spectacular dunk", "amazing block", "clutch shot", "incredible pass",
+        "game-winning play", "fast break", "alley-oop", "deep three pointer",
+        "steal and score", "poster dunk", "game-tying shot", "behind the back pass"
+    ]
+    
+    def __init__(self, backend: str = "tensorrt", model_dir: str = "models",
+                 batch_size: int = 32, decode_workers: int = 4,
+                 motion_percentile: Optional[float] = 60.0, motion_window: int = 30):
+        """
+        Initialize the vision detector
+        
+        Args:
+            backend: Image encoder backend - "tensorrt" (FP16 TensorRT engine
+                through ONNX Runtime on the GPU, "onnx-int8" on the CPU),
+                "onnx-int8" (INT8-quantized ONNX Runtime encoder, CPU only) or
+                "torch". Falls back to torch (FP16 on the GPU) if unavailable
+            model_dir: Directory for exported encoder files
+            batch_size: Number of sampled frames encoded per forward pass
+            decode_workers: Threads decoding separate sections of the video
+            motion_percentile: Only sampled frames whose motion exceeds this
+                percentile of the recent samples are scored by CLIP (None
+                scores every sample)
+            motion_window: Number of recent samples the motion threshold uses
+        """
         self.device = "cuda" if torch.cuda.is_available() else "cpu"
+        self.backend = backend
+        self.model_dir = Path(model_dir)
+        self.batch_size = batch_size
+        self.decode_workers = max(1, decode_workers)
+        self.motion_percentile = motion_percentile
+        self.motion_window = motion_window
         self.model = None
         self.preprocess = None
+        self.gpu_preprocess = None
+        self.onnx_session = None
+        self.onnx_on_device = False
+        self._onnx_out = None
+        self.text_features = None
+        self.text_int8 = None
+        self.text_scale = None
+        self._staging = []
+        self._staging_slot = 0
+        self._load_lock = threading.Lock()
+        self._detect_lock = threading.Lock()
     
     def load_model(self):
-        """Load CLIP model"""
-        if self.model is None:
-            print("Loading CLIP model...")
-            self.model, self.preprocess = clip.load("ViT-B/32", device=self.device)
-            self.model.eval()
+        """Load CLIP model (safe to call from several threads)"""
+        with self._load_lock:
+            if self.model is None:
+                print("Loading CLIP model...")
+                try:
+                    self._load_model()
+                except Exception:
+                    # Don't leave a half-initialized detector behind (it is
+                    # shared across reruns); the next call loads again
+                    self._reset()
+                    raise
+    
+    def _load_model(self):
+        """Load CLIP, the image encoder backend and the prompt features"""
+        self.model, self.preprocess = _get_clip(self.CLIP_MODEL, self.device)
+        
+        # Same resize/crop/normalize as CLIP's PIL preprocess, on uint8
+        # tensors on the device
+        if TV2_AVAILABLE:
+            self.gpu_preprocess = torch.nn.Sequential(
+                v2.Resize(224, interpolation=v2.InterpolationMode.BICUBIC,
+                          antialias=True),
+                v2.CenterCrop(224),
+                v2.ToDtype(torch.float32, scale=True),
+                v2.Normalize(mean=self.CLIP_MEAN, std=self.CLIP_STD)
+            ).to(self.device)
+        
+        if self.backend == "tensorrt" and ORT_AVAILABLE and self.device == "cuda":
+            self._load_tensorrt_encoder()
+        if self.backend in ("tensorrt", "onnx-int8") and ORT_AVAILABLE \
+                and self.device == "cpu":
+            self._load_onnx_encoder()
+        if self.onnx_session is None:
+            if self.device == "cuda":
+                # Autotuned cuDNN kernels, TF32 matmuls and NHWC
+                # layout for the conv stem's tensor cores
+                torch.backends.cudnn.benchmark = True
+                torch.set_float32_matmul_precision("high")
+                self.model.visual.to(memory_format=torch.channels_last)
+            self._compile_image_encoder()
+        
+        self.text_features = self._load_text_features()
+        if self.device == "cuda" and hasattr(torch, "_int_mm"):
+            self._quantize_text_features()
+    
+    def unload(self):
+        """
+        Free the CLIP model, encoder session and buffers (GPU memory included)
+        
+        The shared model cache is cleared too; the next load_model loads
+        everything again.
+        """
+        with self._detect_lock, self._load_lock:
+            self._reset()
+            _get_clip.cache_clear()
+            gc.collect()
+            
+            if torch.cuda.is_available():
+                torch.cuda.empty_cache()
+    
+    def _reset(self):
+        """Drop the loaded model, encoder session and buffers"""
+        self.model = None
+        self.preprocess = None
+        self.gpu_preprocess = None
+        self.onnx_session = None
+        self.onnx_on_device = False
+        self._onnx_out = None
+        self.text_features = None
+        self.text_int8 = None
+        self.text_scale = None
+        self._staging = []
+    
+    def _compile_image_encoder(self):
+        """
+        Compile the PyTorch image encoder (torch.compile, or TorchScript tracing)
+        
+        Only used when no ONNX encoder is loaded: with backend="torch", or
+        when ONNX Runtime is not installed.
+        """
+        if getattr(self.model, "_encoder_compiled", False):
+            return  # Shared model already compiled by another detector
+        self.model._encoder_compiled = True
+        
+        # Same layout as the real batches (see _score_frames), so the first
+        # batch doesn't recompile
+        dummy = torch.zeros(self.batch_size, 3, 224, 224, device=self.device,
+                            dtype=self.model.dtype)
+        if self.device == "cuda":
+            dummy = dummy.contiguous(memory_format=torch.channels_last)
+        visual = self.model.visual
+        
+        try:
+            self.model.visual = torch.compile(visual, mode="reduce-overhead", fullgraph=False)
+            # Warm up once so compilation happens before the first real batch
+            with torch.no_grad():
+                self.model.visual(dummy)
+            print("Using compiled CLIP image encoder")
+        except Exception as e:
+            try:
+                with torch.no_grad():
+                    self.model.visual = torch.jit.trace(visual, dummy)
+                print("Using TorchScript CLIP image encoder")
+            except Exception:
+                print(f"CLIP image encoder not compiled: {e}")
+                self.model.visual = visual
+    
+    def _load_text_features(self) -> torch.Tensor:
+        """
+        Get normalized CLIP features of the prompts, cached on disk
+        
+        Returns:
+            (len(EXCITING_TEXTS), D) normalized text features on self.device
+        """
+        key = hashlib.sha1(
+            (self.CLIP_MODEL + "\n" + "\n".join(self.EXCITING_TEXTS)).encode("utf-8")
+        ).hexdigest()
+        cache_path = self.model_dir / f"clip_text_{key}.pt"
+        
+        if cache_path.exists():
+            try:
+                features = torch.load(cache_path, map_location=self.device)
+                return features.to(self.model.dtype)
+            except Exception as e:
+                print(f"Ignoring unreadable text feature cache: {e}")
+        
+        text_tokens = clip.tokenize(self.EXCITING_TEXTS).to(self.device)
+        with torch.no_grad():
+            features = self.model.encode_text(text_tokens)
+            features = features / features.norm(dim=-1, keepdim=True)
+        
+        try:
+            self.model_dir.mkdir(parents=True, exist_ok=True)
+            torch.save(features.cpu(), cache_path)
+        except Exception as e:
+            print(f"Could not cache text features: {e}")
+        
+        return features
+    
+    def _export_onnx_encoder(self, onnx_path: Path):
+        """Export the CLIP image encoder to an FP32 ONNX model with a dynamic batch axis"""
+        self.model_dir.mkdir(parents=True, exist_ok=True)
+        visual = copy.deepcopy(self.model.visual).float().cpu().eval()
+        torch.onnx.export(
+            visual,
+            torch.zeros(1, 3, 224, 224),
+            str(onnx_path),
+            input_names=["image"],
+            output_names=["features"],
+            dynamic_axes={"image": {0: "batch"}, "features": {0: "batch"}},
+            opset_version=17
+        )
+    
+    def _load_tensorrt_encoder(self):
+        """
+        Load the CLIP image encoder as an FP16 TensorRT engine
+        
+        The engine is built by ONNX Runtime's TensorRT provider from the FP32
+        ONNX export on first use and cached in model_dir, so later runs only
+        deserialize it. Batches stay on the GPU (see _run_onnx_on_device);
+        without TensorRT the FP16 torch encoder is used instead.
+        """
+        onnx_path = self.model_dir / "clip_vitb32_visual.onnx"
+        
+        if "TensorrtExecutionProvider" not in ort.get_available_providers():
+            return
+        
+        try:
+            if not onnx_path.exists():
+                print("Exporting CLIP image encoder to ONNX (first run only)...")
+                self._export_onnx_encoder(onnx_path)
+            
+            # Optimization profile covering every batch size the detector sends
+            shape = "image:{}x3x224x224"
+            trt_options = {
+                "trt_fp16_enable": True,
+                "trt_engine_cache_enable": True,
+                "trt_engine_cache_path": str(self.model_dir / "trt_cache"),
+                "trt_profile_min_shapes": shape.format(1),
+                "trt_profile_opt_shapes": shape.format(self.batch_size),
+                "trt_profile_max_shapes": shape.format(self.batch_size)
+            }
+            self.onnx_session = ort.InferenceSession(
+                str(onnx_path),
+                providers=[("TensorrtExecutionProvider", trt_options),
+                           "CUDAExecutionProvider"]
+            )
+            # The provider is listed even without TensorRT libraries, in which
+            # case the session silently runs on CUDA (or CPU) instead
+            if "TensorrtExecutionProvider" not in self.onnx_session.get_providers():
+                print("TensorRT libraries not found, using PyTorch")
+                self.onnx_session = None
+                return
+            
+            self.onnx_on_device = True
+            self._onnx_out = torch.empty(self.batch_size, self.model.visual.output_dim,
+                                         device=self.device)
+            print("Using FP16 TensorRT CLIP image encoder")
+        except Exception as e:
+            print(f"TensorRT encoder unavailable, using PyTorch: {e}")
+            self.onnx_session = None
+            self.onnx_on_device = False
+    
+    def _load_onnx_encoder(self):
+        """Export the CLIP image encoder to ONNX, quantize it to INT8 and load it"""
+        onnx_path = self.model_dir / "clip_vitb32_visual.onnx"
+        int8_path = self.model_dir / "clip_vitb32_visual.int8.onnx"
+        
+        try:
+            if not int8_path.exists():
+                print("Exporting CLIP image encoder to INT8 ONNX (first run only)...")
+                if not onnx_path.exists():
+                    self._export_onnx_encoder(onnx_path)
+                quantize_dynamic(str(onnx_path), str(int8_path), weight_type=QuantType.QInt8)
+            
+            self.onnx_session = ort.InferenceSession(str(int8_path),
+                                                     providers=["CPUExecutionProvider"])
+            print("Using INT8 ONNX CLIP image encoder")
+        except Exception as e:
+            print(f"INT8 encoder unavailable, using PyTorch: {e}")
+            self.onnx_session = None
+    
+    def _encode_images(self, images: torch.Tensor) -> torch.Tensor:
+        """
+        Encode a batch of preprocessed images into normalized CLIP features
+        
+        Args:
+            images: (N, 3, 224, 224) preprocessed image tensor
+            
+        Returns:
+            (N, D) L2-normalized image features on self.device
+        """
+        if self.onnx_on_device:
+            features = self._run_onnx_on_device(images)
+        elif self.onnx_session is not None:
+            # INT8 encoder on the CPU
+            features = self.onnx_session.run(
+                None, {"image": images.float().cpu().numpy()})[0]
+            features = torch.from_numpy(features).to(self.device, dtype=self.model.dtype)
+        else:
+            features = self.model.encode_image(images)
+        
+        return features / features.norm(dim=-1, keepdim=True)
+    
+    def _run_onnx_on_device(self, images: torch.Tensor) -> torch.Tensor:
+        """
+        Run the TensorRT encoder on a GPU batch without copying it to the host
+        
+        The batch and the preallocated output buffer are bound to the session
+        by device pointer.
+        
+        Returns:
+            (N, D) unnormalized image features in the CLIP model's dtype
+        """
+        images = images.float().contiguous()
+        out = self._onnx_out[:images.shape[0]]
+        
+        binding = self.onnx_session.io_binding()
+        binding.bind_input("image", "cuda", 0, np.float32, tuple(images.shape),
+                           images.data_ptr())
+        binding.bind_output("features", "cuda", 0, np.float32, tuple(out.shape),
+                            out.data_ptr())
+        
+        # The session runs on its own stream; the batch must be ready first
+        torch.cuda.current_stream().synchronize()
+        self.onnx_session.run_with_iobinding(binding)
+        return out.to(self.model.dtype)
+    
+    def _sampled_frames(self, video_path: str, fps: float, total_frames: int,
+                        frame_step: int, samples_per_section: int = 16
+                        ) -> Iterator[Tuple[float, np.ndarray]]:
+        """
+        Decode only the sampled frames of a video, in order
+        
+        With PyAV, the video is split into sections of samples_per_section
+        samples; each section is decoded by a worker thread that seeks to the
+        keyframe before it, so sections decode in parallel and no frames before
+        a section are decoded. Without PyAV, frames between samples are
+        grabbed but never converted.
+        
+        Args:
+            video_path: Path to video file
+            fps: Video frame rate
+            total_frames: Number of frames in the video
+            frame_step: Sample every Nth frame
+            samples_per_section: Samples decoded by one worker at a time
+            
+        Yields:
+            (timestamp, RGB frame) pairs, frames downscaled to CLIP's input size
+        """
+        if PYAV_AVAILABLE:
+            num_samples = (total_frames + frame_step - 1) // frame_step
+            sections = [(first, min(first + samples_per_section, num_samples))
+                        for first in range(0, num_samples, samples_per_section)]
+            
+            # Keep a few sections decoding ahead of the consumer
+            with ThreadPoolExecutor(max_workers=self.decode_workers) as pool:
+                futures = deque()
+                for first, last in sections:
+                    futures.append(pool.submit(self._decode_section, video_path, fps,
+                                               frame_step, first, last))
+                    if len(futures) > self.decode_workers:
+                        yield from futures.popleft().result()
+                while futures:
+                    yield from futures.popleft().result()
+            return
+        
+        # Fallback: OpenCV decode, only retrieving the sampled frames
+        cap = cv2.VideoCapture(video_path)
+        frame_num = 0
+        try:
+            while cap.grab():
+                if frame_num % frame_step == 0:
+                    ret, frame = cap.retrieve()
+                    if ret:
+                        yield frame_num / fps, cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+                frame_num += 1
+        finally:
+            cap.release()
+    
+    def _decode_section(self, video_path: str, fps: float, frame_step: int,
+                        first: int, last: int) -> List[Tuple[float, np.ndarray]]:
+        """
+        Decode the samples first..last-1 of a video with PyAV
+        
+        Returns:
+            (timestamp, RGB frame) pairs, frames scaled so the short side is 224
+        """
+        samples = []
+        start_frame = first * frame_step
+        end_frame = last * frame_step
+        
+        with av.open(video_path) as container:
+            stream = container.streams.video[0]
+            stream.thread_type = "AUTO"
+            container.seek(int(start_frame / fps / stream.time_base), stream=stream)
+            
+            for frame in container.decode(stream):
+                if frame.pts is None:
+                    continue
+                frame_num = int(round(float(frame.pts * stream.time_base) * fps))
+                if frame_num >= end_frame:
+                    break
+                if frame_num < start_frame or frame_num % frame_step:
+                    continue
+                
+                # Let swscale shrink to CLIP's input size while converting
+                scale = min(1.0, 224 / min(frame.width, frame.height))
+                width = max(1, round(frame.width * scale))
+                height = max(1, round(frame.height * scale))
+                samples.append((frame_num / fps,
+                                frame.to_ndarray(format="rgb24", width=width, height=height)))
+        
+        return samples
+    
+    def _quantize_text_features(self):
+        """
+        Quantize the prompt features to int8 (one scale per prompt) for int8 matmuls
+        
+        torch._int_mm needs the output width to be a multiple of 8, so the
+        prompts are zero-padded to the next multiple.
+        """
+        features = self.text_features.float()
+        scale = features.abs().amax(dim=1, keepdim=True).clamp(min=1e-8) / 127
+        quantized = (features / scale).round().to(torch.int8)
+        
+        padded_rows = -(-len(features) // 8) * 8
+        text_int8 = torch.zeros(padded_rows, features.shape[1], dtype=torch.int8,
+                                device=self.device)
+        text_int8[:len(features)] = quantized
+        text_scale = torch.zeros(1, padded_rows, device=self.device)
+        text_scale[0, :len(features)] = scale[:, 0]
+        
+        self.text_int8 = text_int8.T.contiguous()
+        self.text_scale = text_scale
+    
+    def _similarities(self, image_features: torch.Tensor,
+                      text_features: torch.Tensor) -> torch.Tensor:
+        """
+        Cosine similarities between normalized image and prompt features
+        
+        Uses an int8 x int8 -> int32 matmul on the GPU when the batch is large
+        enough for torch._int_mm (more than 16 rows), float matmul otherwise.
+        
+        Returns:
+            (N, len(text_features)) similarity matrix
+        """
+        if (self.text_int8 is not None and image_features.is_cuda
+                and image_features.shape[0] > 16):
+            try:
+                features = image_features.float()
+                scale = features.abs().amax(dim=1, keepdim=True).clamp(min=1e-8) / 127
+                quantized = (features / scale).round().to(torch.int8)
+                similarities = torch._int_mm(quantized, self.text_int8).float()
+                return (similarities * scale * self.text_scale)[:, :len(text_features)]
+            except RuntimeError:
+                self.text_int8 = None  # Not supported on this GPU
+        
+        return image_features @ text_features.T
+    
+    def _preprocess_frame(self, frame_rgb: np.ndarray, out: torch.Tensor):
+        """
+        Preprocess an RGB frame for CLIP into a preallocated tensor
+        
+        Args:
+            frame_rgb: (H, W, 3) uint8 RGB frame
+            out: (3, 224, 224) tensor receiving the normalized image
+        """
+        with torch.no_grad():
+            if self.gpu_preprocess is None:
+                out.copy_(self.preprocess(Image.fromarray(frame_rgb)))
+                return
+            
+            # Upload the raw uint8 frame (a quarter of the float bytes) and
+            # resize/normalize it on the device
+            image = torch.from_numpy(frame_rgb).permute(2, 0, 1)
+            if self.device == "cuda":
+                image = self._upload_frame(image)
+            out.copy_(self.gpu_preprocess(image.to(self.device)))
+    
+    def _upload_frame(self, image: torch.Tensor) -> torch.Tensor:
+        """
+        Copy a uint8 frame to the GPU through reused pinned staging buffers
+        
+        Two staging slots alternate, so a frame is written to host memory
+        while the previous one is still being copied to the device.
+        
+        Args:
+            image: (3, H, W) uint8 CPU tensor
+            
+        Returns:
+            (3, H, W) uint8 tensor on the GPU
+        """
+        if not self._staging or self._staging[0][0].shape != image.shape:
+            self._staging = [
+                (torch.empty(image.shape, dtype=torch.uint8).pin_memory(),
+                 torch.empty(image.shape, dtype=torch.uint8, device=self.device),
+                 torch.cuda.Event())
+                for _ in range(2)
+            ]
+        
+        self._staging_slot = 1 - self._staging_slot
+        host, device, copied = self._staging[self._staging_slot]
+        copied.synchronize()  # Previous upload from this slot has finished
+        host.copy_(image)
+        device.copy_(host, non_blocking=True)
+        copied.record()
+        return device
+    
+    @staticmethod
+    def _motion_score(prev_gray: np.ndarray, cur_gray: np.ndarray) -> float:
+        """Mean absolute difference between two small grayscale frames"""
+        return float(cv2.absdiff(prev_gray, cur_gray).mean())
+    
+    def _moving_frames(self, samples: Iterator[Tuple[float, np.ndarray]]
+                       ) -> Iterator[Tuple[float, np.ndarray]]:
+        """
+        Drop sampled frames with little motion (dead balls, timeouts)
+        
+        Each sample is compared with the previous one on 160x90 grayscale
+        copies, and kept only if its motion is above motion_percentile of the
+        last motion_window samples. Until the window is a third full, every
+        sample is kept.
+        
+        Args:
+            samples: (timestamp, RGB frame) pairs
+            
+        Yields:
+            The (timestamp, RGB frame) pairs worth scoring
+        """
+        if self.motion_percentile is None:
+            yield from samples
+            return
+        
+        history = deque(maxlen=self.motion_window)
+        prev_gray = None
+        for current_time, frame_rgb in samples:
+            gray = cv2.cvtColor(cv2.resize(frame_rgb, (160, 90), interpolation=cv2.INTER_AREA),
+                                cv2.COLOR_RGB2GRAY)
+            if prev_gray is None:
+                prev_gray = gray
+                yield current_time, frame_rgb
+                continue
+            
+            motion = self._motion_score(prev_gray, gray)
+            prev_gray = gray
+            keep = (len(history) < max(1, self.motion_window // 3)
+                    or motion > np.percentile(history, self.motion_percentile))
+            history.append(motion)
+            if keep:
+                yield current_time, frame_rgb
+    
+    def _produce_batches(self, video_path: str, fps: float, total_frames: int,
+                         frame_step: int, batches: queue.Queue, stop: threading.Event):
+        """
+        Decode and preprocess sampled frames into batches (runs on its own thread)
+        
+        Near-static samples are skipped (see _moving_frames); the rest are
+        preprocessed straight into a ring of preallocated batch
+        tensors, one more than can be queued or in use at once. Puts
+        (timestamps, (N, 3, 224, 224) tensor) items on the queue, an
+        exception if decoding fails, and finally None.
+        """
+        def put(item) -> bool:
+            while not stop.is_set():
+                try:
+                    batches.put(item, timeout=0.1)
+                    return True
+                except queue.Full:
+                    continue
+            return False
+        
+        # Batch tensors live where preprocessing happens (pinned on the host
+        # for the PIL path, so uploads can be asynchronous)
+        on_device = self.gpu_preprocess is not None
+        buffers = [
+            torch.empty(self.batch_size, 3, 224, 224,
+                        device=self.device if on_device else "cpu",
+                        pin_memory=not on_device and self.device == "cuda")
+            for _ in range(batches.maxsize + 2)
+        ]
+        buffer_idx = 0
+        
+        count = 0
+        batch_times = []
+        try:
+            samples = self._sampled_frames(video_path, fps, total_frames, frame_step)
+            for current_time, frame_rgb in self._moving_frames(samples):
+                self._preprocess_frame(frame_rgb, buffers[buffer_idx][count])
+                batch_times.append(current_time)
+                count += 1
+                
+                if count == self.batch_size:
+                    if not put((batch_times, buffers[buffer_idx][:count])):
+                        return
+                    buffer_idx = (buffer_idx + 1) % len(buffers)
+                    count = 0
+                    batch_times = []
+            
+            if count:
+                put((batch_times, buffers[buffer_idx][:count]))
+        except Exception as e:
+            put(e)
+        finally:
+            put(None)
+    
+    def _score_frames(self, images: torch.Tensor, timestamps: List[float],
+                      text_features: torch.Tensor, texts: List[str]) -> List[Dict]:
+        """
+        Encode a batch of sampled frames and keep those matching an exciting prompt
+        
+        Args:
+            images: (N, 3, 224, 224) preprocessed frames
+            timestamps: Timestamp of each frame
+            text_features: Normalized prompt features
+            texts: Prompt for each row of text_features
+            
+        Returns:
+            Highlights for frames above the similarity threshold
+        """
+        batch = images.to(self.device, non_blocking=True)
+        if self.device == "cuda" and self.onnx_session is None:
+            batch = batch.contiguous(memory_format=torch.channels_last)
+        
+        with torch.no_grad():
+            # Compute similarity scores and the best prompt per frame on the
+            # device, for the whole batch at once
+            similarities = self._similarities(self._encode_images(batch), text_features)
+            max_scores, best_texts = similarities.float().max(dim=1)
+        
+        max_scores = max_scores.cpu().numpy()
+        best_texts = best_texts.cpu().numpy()
+        
+        # Store if above threshold
+        keep = np.flatnonzero(max_scores > 0.25)  # Threshold for exciting moments
+        return [
+            {
+                "timestamp": timestamps[i],
+                "score": float(max_scores[i]),
+                "description": texts[int(best_texts[i])]
+            }
+            for i in keep
+        ]
     
     def detect_highlights(self, video_path: str, sample_interval: int = 2) -> List[Dict]:
         """
@@ -47,72 +710,71 @@ class VisionDetector:
             print("CLIP not available - visual detection skipped. Install CLIP for visual analysis.")
             return []
         
-        self.load_model()
-        
-        # NBA action keywords for CLIP
-        exciting_texts = [
-            "spectacular dunk", "amazing block", "clutch shot", "incredible pass",
-            "game-winning play", "fast break", "alley-oop", "deep three pointer",
-            "steal and score", "poster dunk", "game-tying shot", "behind the back pass"
-        ]
+        # The detector is shared by every session, and a detection reuses its
+        # staging buffers, TensorRT output buffer and CUDA graphs - run one at
+        # a time (they would compete for the same GPU anyway)
+        with self._detect_lock:
+            self.load_model()
+            return self._detect_highlights(video_path, sample_interval)
+    
+    def _detect_highlights(self, video_path: str, sample_interval: int) -> List[Dict]:
+        """Analyze video frames to find exciting moments (model loaded, lock held)"""
+        text_features = self.text_features
+        exciting_texts = self.EXCITING_TEXTS
         
         try:
-            # Prepare text encodings
-            text_tokens = clip.tokenize(exciting_texts).to(self.device)
-            with torch.no_grad():
-                text_features = self.model.encode_text(text_tokens)
-                text_features = text_features / text_features.norm(dim=-1, keepdim=True)
-            
             # Open video
             cap = cv2.VideoCapture(video_path)
             fps = cap.get(cv2.CAP_PROP_FPS)
             total_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
             duration = total_frames / fps
+            cap.release()
             
             highlights = []
-            frame_num = 0
             
             print(f"Analyzing video: {duration:.1f}s, sampling every {sample_interval}s")
             
-            while True:
-                ret, frame = cap.read()
-                if not ret:
-                    break
-                
-                current_time = frame_num / fps
-                
-                # Sample at intervals
-                if frame_num % int(fps * sample_interval) == 0:
-                    # Convert frame to PIL Image
-                    frame_rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-                    frame_pil = Image.fromarray(frame_rgb)
-                    
-                    # Preprocess and encode
-                    image_input = self.preprocess(frame_pil).unsqueeze(0).to(self.device)
-                    
-                    with torch.no_grad():
-                        image_features = self.model.encode_image(image_input)
-                        image_features = image_features / image_features.norm(dim=-1, keepdim=True)
-                        
-                        # Compute similarity scores
-                        similarities = (image_features @ text_features.T).squeeze().cpu().numpy()
-                        max_score = float(np.max(similarities))
-                    
-                    # Store if above threshold
-                    if max_score > 0.25:  # Threshold for exciting moments
-                        highlights.append({
-                            "timestamp": current_time,
-                            "score": max_score,
-                            "description": exciting_texts[np.argmax(similarities)]
-                        })
-                
-                frame_num += 1
+            # Sample at intervals: a decode thread fills batches while this
+            # thread encodes them, on a separate CUDA stream when on the GPU
+            frame_step = max(1, int(fps * sample_interval))
+            batches = queue.Queue(maxsize=4)
+            stop = threading.Event()
+            producer = threading.Thread(
+                target=self._produce_batches,
+                args=(video_path, fps, total_frames, frame_step, batches, stop),
+                daemon=True
+            )
+            producer.start()
+            stream = torch.cuda.Stream() if self.device == "cuda" else None
             
-            cap.release()
+            try:
+                while True:
+                    item = batches.get()
+                    if item is None:
+                        break
+                    if isinstance(item, Exception):
+                        raise item
+                    
+                    batch_times, batch = item
+                    if stream is not None:
+                        # Batches were preprocessed on the decode thread's stream
+                        stream.wait_stream(torch.cuda.default_stream())
+                        with torch.cuda.stream(stream):
+                            highlights += self._score_frames(batch, batch_times, text_features,
+                                                             exciting_texts)
+                    else:
+                        highlights += self._score_frames(batch, batch_times, text_features,
+                                                         exciting_texts)
+            finally:
+                stop.set()
+                producer.join()
             
-            # Sort by score and return top highlights
+            # Return top 10 visual highlights, sorted by score
+            if len(highlights) > 10:
+                scores = np.array([h["score"] for h in highlights])
+                highlights = [highlights[i] for i in np.argpartition(-scores, 10)[:10]]
             highlights.sort(key=lambda x: x["score"], reverse=True)
-            return highlights[:10]  # Return top 10 visual highlights
+            return highlights
             
         except Exception as e:
             print(f"Vision detection error: {e}")
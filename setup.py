@@ -3,62 +3,56 @@ Setup script for NBA Shorts AI
 Helps verify installation and create necessary directories
 """
 
+import io
 import os
+import shutil
 import sys
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-import subprocess
 
 
-def check_ffmpeg():
-    """Check if FFmpeg is installed"""
-    try:
-        result = subprocess.run(
-            ["ffmpeg", "-version"],
-            capture_output=True,
-            text=True
-        )
-        if result.returncode == 0:
-            print("✅ FFmpeg is installed")
-            return True
-        else:
-            print("❌ FFmpeg not found")
-            return False
-    except FileNotFoundError:
-        print("❌ FFmpeg not found")
-        print("   Install: https://ffmpeg.org/download.html")
+def check_ffmpeg(out=None):
+    """Check if FFmpeg is installed (messages go to out, stdout by default)"""
+    path = shutil.which("ffmpeg")
+    if path:
+        print(f"✅ FFmpeg is installed ({path})", file=out)
+        return True
+    else:
+        print("❌ FFmpeg not found", file=out)
+        print("   Install: https://ffmpeg.org/download.html", file=out)
         return False
 
 
-def check_python_version():
+def check_python_version(out=None):
     """Check Python version"""
     version = sys.version_info
     if version.major >= 3 and version.minor >= 10:
-        print(f"✅ Python {version.major}.{version.minor}.{version.micro}")
+        print(f"✅ Python {version.major}.{version.minor}.{version.micro}", file=out)
         return True
     else:
-        print(f"❌ Python {version.major}.{version.minor}.{version.micro} (requires 3.10+)")
+        print(f"❌ Python {version.major}.{version.minor}.{version.micro} (requires 3.10+)", file=out)
         return False
 
 
-def check_env_file():
+def check_env_file(out=None):
     """Check if .env file exists and is configured"""
     env_path = Path(".env")
     if not env_path.exists():
-        print("⚠️  .env file not found")
-        print("   Copy env_example.txt to .env and add your API key")
+        print("⚠️  .env file not found", file=out)
+        print("   Copy env_example.txt to .env and add your API key", file=out)
         return False
     
     with open(env_path) as f:
         content = f.read()
         if "your_api_key_here" in content:
-            print("⚠️  .env file exists but not configured")
-            print("   Add your OpenRouter API key to .env")
+            print("⚠️  .env file exists but not configured", file=out)
+            print("   Add your OpenRouter API key to .env", file=out)
             return False
         elif "OPENROUTER_API_KEY" in content:
-            print("✅ .env file is configured")
+            print("✅ .env file is configured", file=out)
             return True
     
-    print("⚠️  .env file exists but may not be properly configured")
+    print("⚠️  .env file exists but may not be properly configured", file=out)
     return False
 
 
@@ -77,17 +71,16 @@ def main():
     print("=" * 50)
     print()
     
-    # Check Python version
-    python_ok = check_python_version()
-    print()
-    
-    # Check FFmpeg
-    ffmpeg_ok = check_ffmpeg()
-    print()
+    # Check Python version, FFmpeg and .env file concurrently, each into its
+    # own buffer so the report keeps its order
+    checks = [check_python_version, check_ffmpeg, check_env_file]
+    buffers = [io.StringIO() for _ in checks]
+    with ThreadPoolExecutor(max_workers=len(checks)) as executor:
+        futures = [executor.submit(check, buf) for check, buf in zip(checks, buffers)]
+        python_ok, ffmpeg_ok, env_ok = [future.result() for future in futures]
     
-    # Check .env file
-    env_ok = check_env_file()
-    print()
+    for buf in buffers:
+        print(buf.getvalue())
     
     # Create directories
     create_directories()